@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """Generate PNG icons for PWA by recreating the design with PIL."""
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import numpy as np
 import os
-import math
+import shutil
+import subprocess
 
 # Icon sizes needed for PWA and App Store
 ICON_SIZES = [
@@ -17,23 +21,70 @@ ICON_SIZES = [
     1024,             # App Store
 ]
 
+def _resolve_font_path(candidates):
+    """Return the first font name/path FreeType can open, or None."""
+    for name in candidates:
+        try:
+            ImageFont.truetype(name, 10)
+            return name
+        except:
+            pass
+    return None
+
+
+# Resolve font locations once; opening a FreeType face per icon size is wasted work
+FONT_PATH = _resolve_font_path(['Georgia', 'Times New Roman', 'DejaVu Serif',
+                                'C:\\Windows\\Fonts\\times.ttf', 'C:\\Windows\\Fonts\\georgia.ttf'])
+SYMBOL_FONT_PATH = _resolve_font_path(['C:\\Windows\\Fonts\\segoeui.ttf', 'DejaVu Sans', 'DejaVuSans.ttf'])
+
+
+@functools.lru_cache(maxsize=64)
+def get_font(font_size):
+    """Get the letter font at the given size (cached across icon sizes)."""
+    if FONT_PATH:
+        return ImageFont.truetype(FONT_PATH, font_size)
+    return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=64)
+def get_symbol_font(font_size):
+    """Get the suit-symbol font at the given size (cached)."""
+    if SYMBOL_FONT_PATH:
+        return ImageFont.truetype(SYMBOL_FONT_PATH, font_size)
+    return get_font(font_size)
+
+
+@functools.lru_cache(maxsize=64)
+def get_letter_bbox(font_size, text='D'):
+    """Get the bbox of the letter at the given size, or None for bitmap fonts."""
+    font = get_font(font_size)
+    if hasattr(font, 'getbbox'):
+        return font.getbbox(text)
+    return None
+
+
 def create_gradient(size, color1, color2):
     """Create a diagonal gradient from top-left to bottom-right."""
-    img = Image.new('RGB', (size, size))
-    pixels = img.load()
+    max_dist = 2 * size - 2 if size > 1 else 1
+
+    # Diagonal gradient factor for every pixel: (x + y) / max_dist
+    factor = np.add.outer(
+        np.arange(size, dtype=np.float32),
+        np.arange(size, dtype=np.float32)
+    ) / max_dist
 
-    for y in range(size):
-        for x in range(size):
-            # Diagonal gradient factor
-            factor = (x + y) / (2 * size - 2) if size > 1 else 0
+    arr = np.empty((size, size, 3), dtype=np.uint8)
+    for c in range(3):
+        arr[..., c] = (color1[c] + (color2[c] - color1[c]) * factor).astype(np.uint8)
 
-            r = int(color1[0] + (color2[0] - color1[0]) * factor)
-            g = int(color1[1] + (color2[1] - color1[1]) * factor)
-            b = int(color1[2] + (color2[2] - color1[2]) * factor)
+    return Image.fromarray(arr, 'RGB')
 
-            pixels[x, y] = (r, g, b)
 
-    return img
+def build_wave_points(size, wave_y, scale):
+    """Build the sine-wave polygon points as a list of (x, y) tuples."""
+    xs = np.arange(size + 1)
+    ys = wave_y + (30 * scale * np.sin(xs * 2 * np.pi / size)).astype(np.int32)
+    return list(zip(xs.tolist(), ys.tolist()))
 
 
 def draw_rounded_rect(draw, xy, radius, fill, outline=None, outline_width=1):
@@ -41,7 +92,12 @@ def draw_rounded_rect(draw, xy, radius, fill, outline=None, outline_width=1):
     x1, y1, x2, y2 = xy
     r = min(radius, (x2-x1)//2, (y2-y1)//2)
 
-    # Draw rounded rectangle using pieslice and rectangles
+    # Pillow >= 8.2 draws this in a single C call
+    if hasattr(draw, 'rounded_rectangle'):
+        draw.rounded_rectangle(xy, radius=r, fill=fill, outline=outline, width=outline_width)
+        return
+
+    # Fallback: compose from pieslices and rectangles
     draw.rectangle([x1+r, y1, x2-r, y2], fill=fill, outline=None)
     draw.rectangle([x1, y1+r, x2, y2-r], fill=fill, outline=None)
 
@@ -63,6 +119,24 @@ def draw_rounded_rect(draw, xy, radius, fill, outline=None, outline_width=1):
         draw.line([x2, y1+r, x2, y2-r], fill=outline, width=outline_width)
 
 
+@functools.lru_cache(maxsize=64)
+def _suit_sprite(symbol, font_size, color):
+    """Pre-rendered suit glyph cropped to its bbox (cached per size/color)."""
+    img = Image.new('RGBA', (font_size * 2, font_size * 2), (0, 0, 0, 0))
+    ImageDraw.Draw(img).text((0, 0), symbol, fill=color, font=get_symbol_font(font_size))
+    bbox = img.getbbox()
+    return img.crop(bbox) if bbox else img
+
+
+@functools.lru_cache(maxsize=32)
+def _rounded_mask(size):
+    """Rounded-corner mask for a square canvas (cached; never mutate)."""
+    mask = Image.new('L', (size, size), 0)
+    corner_radius = int(size * 80 / 512)  # Scaled from 80px at 512
+    draw_rounded_rect(ImageDraw.Draw(mask), [0, 0, size-1, size-1], corner_radius, fill=255)
+    return mask
+
+
 def create_icon(size):
     """Create icon at specified size."""
     # Colors from SVG
@@ -79,12 +153,7 @@ def create_icon(size):
 
     # Create RGBA image for rounded corners
     final = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    mask = Image.new('L', (size, size), 0)
-    mask_draw = ImageDraw.Draw(mask)
-
-    # Draw rounded background mask
-    corner_radius = int(size * 80 / 512)  # Scaled from 80px at 512
-    draw_rounded_rect(mask_draw, [0, 0, size-1, size-1], corner_radius, fill=255)
+    mask = _rounded_mask(size)
 
     # Paste gradient with mask
     final.paste(img, mask=mask)
@@ -107,28 +176,16 @@ def create_icon(size):
                      [card_x, card_y, card_x + card_w, card_y + card_h],
                      card_radius, fill=card_color, outline=turquoise, outline_width=card_stroke)
 
-    # Try to get a font for the D letter
+    # Font for the D letter
     font_size = int(180 * scale)
     small_font_size = int(40 * scale)
-
-    try:
-        # Try different fonts
-        for font_name in ['Georgia', 'Times New Roman', 'DejaVu Serif', 'C:\\Windows\\Fonts\\times.ttf', 'C:\\Windows\\Fonts\\georgia.ttf']:
-            try:
-                font = ImageFont.truetype(font_name, font_size)
-                break
-            except:
-                pass
-        else:
-            font = ImageFont.load_default()
-    except:
-        font = ImageFont.load_default()
+    font = get_font(font_size)
 
     # Draw D letter centered in card
     text = "D"
     # Get text bounding box
-    if hasattr(font, 'getbbox'):
-        bbox = font.getbbox(text)
+    bbox = get_letter_bbox(font_size, text)
+    if bbox:
         text_width = bbox[2] - bbox[0]
         text_height = bbox[3] - bbox[1]
     else:
@@ -142,11 +199,6 @@ def create_icon(size):
 
     # Draw suit symbols if size is large enough (skip for very small icons)
     if size >= 64:
-        try:
-            symbol_font = ImageFont.truetype('C:\\Windows\\Fonts\\segoeui.ttf', small_font_size)
-        except:
-            symbol_font = font
-
         # Suit positions (from SVG)
         # Heart top-left: x="180" y="160"
         # Spade top-right: x="332" y="160"
@@ -160,9 +212,13 @@ def create_icon(size):
             ('\u2663', int(332 * scale), int(390 * scale), dark),      # Club
         ]
 
+        # Composite cached glyph sprites; one FreeType rasterization per
+        # (glyph, size, color) across the whole run
         for symbol, x, y, color in symbols:
             try:
-                draw.text((x - small_font_size//2, y - small_font_size), symbol, fill=color, font=symbol_font)
+                sprite = _suit_sprite(symbol, small_font_size, color)
+                final.alpha_composite(sprite, dest=(max(0, x - sprite.width // 2),
+                                                    max(0, y - sprite.height)))
             except:
                 pass
 
@@ -172,42 +228,74 @@ def create_icon(size):
         wave_color = (64, 224, 208, 76)  # #40E0D0 with 0.3 opacity
 
         # Create wave overlay
-        wave = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-        wave_draw = ImageDraw.Draw(wave)
+        overlay = Image.new('RGBA', (size, size), (0, 0, 0, 0))
 
         # Simple curved wave using polygon
-        points = []
-        for x in range(size + 1):
-            # Sine wave pattern
-            y_offset = int(30 * scale * math.sin(x * 2 * math.pi / size))
-            y = wave_y + y_offset
-            points.append((x, y))
+        points = build_wave_points(size, wave_y, scale)
 
         # Close the polygon at bottom
         points.append((size, size))
         points.append((0, size))
 
-        wave_draw.polygon(points, fill=wave_color)
-
-        # Apply mask to keep rounded corners
-        wave_masked = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-        wave_masked.paste(wave, mask=mask)
+        ImageDraw.Draw(overlay).polygon(points, fill=wave_color)
 
-        final = Image.alpha_composite(final, wave_masked)
+        # Clip to the rounded corners via the alpha channel and composite
+        # in place - no second full-size temporary needed
+        overlay.putalpha(ImageChops.multiply(overlay.getchannel('A'), mask))
+        final.alpha_composite(overlay)
 
     return final
 
 
-def generate_icons():
+# Pillow's optimize=True runs zlib at high effort per save; when oxipng is
+# installed (optional) we encode fast and recompress once at the end, which
+# is both quicker and smaller
+OXIPNG = shutil.which('oxipng')
+SAVE_KWARGS = {'optimize': False, 'compress_level': 1} if OXIPNG else {'optimize': True}
+
+
+def optimize_pngs(paths):
+    """Recompress PNGs in-place with oxipng if it is installed."""
+    if OXIPNG and paths:
+        print("Recompressing with oxipng...")
+        subprocess.run([OXIPNG, '-o', '4', '--strip', 'safe', *paths], check=False)
+
+
+# Master icon shared by the worker processes (rendered once per worker)
+_master = None
+
+
+def _init_icon_worker():
+    global _master
+    _master = create_icon(max(ICON_SIZES))
+
+
+def _render_one_icon(size):
+    """Render and save a single icon size (process pool worker)."""
     base_dir = os.path.dirname(os.path.abspath(__file__))
     icons_dir = os.path.join(base_dir, 'icons')
+    output_path = os.path.join(icons_dir, f'icon-{size}x{size}.png')
+    print(f"Generating {size}x{size} icon...")
+
+    # Downscale the master with Lanczos; only the tiny favicon sizes are
+    # re-drawn for sharpness
+    if size == max(ICON_SIZES):
+        icon = _master
+    elif size <= 32:
+        icon = create_icon(size)
+    else:
+        icon = _master.resize((size, size), Image.LANCZOS)
+    icon.save(output_path, 'PNG', **SAVE_KWARGS)
+    return output_path
 
-    for size in ICON_SIZES:
-        output_path = os.path.join(icons_dir, f'icon-{size}x{size}.png')
-        print(f"Generating {size}x{size} icon...")
 
-        icon = create_icon(size)
-        icon.save(output_path, 'PNG', optimize=True)
+def generate_icons():
+    # Each output is independent and CPU-bound (draws + PNG encode), so
+    # fan the sizes out across a process pool
+    with ProcessPoolExecutor(initializer=_init_icon_worker) as ex:
+        paths = list(ex.map(_render_one_icon, ICON_SIZES))
+
+    optimize_pngs(paths)
 
     print(f"\nGenerated {len(ICON_SIZES)} icons successfully!")
     return True
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """Generate splash screens for PWA iOS devices."""
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import numpy as np
 import os
-import math
+import shutil
+import subprocess
 
 # Splash screen dimensions (width x height in landscape)
 # From the plan - landscape orientation
@@ -22,24 +26,78 @@ SPLASH_SCREENS = [
 ]
 
 
+def _resolve_font_path(candidates):
+    """Return the first font name/path FreeType can open, or None."""
+    for name in candidates:
+        try:
+            ImageFont.truetype(name, 10)
+            return name
+        except:
+            pass
+    return None
+
+
+# Resolve font locations once; every splash rebuilds the logo and would
+# otherwise re-probe the font list each time
+FONT_PATH = _resolve_font_path(['Georgia', 'C:\\Windows\\Fonts\\georgia.ttf',
+                                'C:\\Windows\\Fonts\\times.ttf', 'DejaVu Serif'])
+SYMBOL_FONT_PATH = _resolve_font_path(['C:\\Windows\\Fonts\\segoeui.ttf', 'DejaVu Sans', 'DejaVuSans.ttf'])
+
+
+@functools.lru_cache(maxsize=64)
+def get_font(font_size):
+    """Get the letter font at the given size (cached across logo sizes)."""
+    if FONT_PATH:
+        return ImageFont.truetype(FONT_PATH, font_size)
+    return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=64)
+def get_symbol_font(font_size):
+    """Get the suit-symbol font at the given size (cached)."""
+    if SYMBOL_FONT_PATH:
+        return ImageFont.truetype(SYMBOL_FONT_PATH, font_size)
+    return get_font(font_size)
+
+
+@functools.lru_cache(maxsize=64)
+def get_letter_bbox(font_size, text='D'):
+    """Get the bbox of the letter at the given size, or None for bitmap fonts."""
+    font = get_font(font_size)
+    if hasattr(font, 'getbbox'):
+        return font.getbbox(text)
+    return None
+
+
 def create_gradient(width, height, color1, color2):
     """Create a diagonal gradient from top-left to bottom-right."""
-    img = Image.new('RGB', (width, height))
-    pixels = img.load()
+    # The ramp is a smooth 1-D function of (x + y), so large gradients are
+    # synthesized at 1/8 resolution and upscaled with bilinear
+    # interpolation - visually identical at a fraction of the bandwidth
+    if width * height > 512 * 512:
+        small = create_gradient(width // 8, height // 8, color1, color2)
+        return small.resize((width, height), Image.BILINEAR)
 
     max_dist = width + height - 2 if (width > 1 and height > 1) else 1
 
-    for y in range(height):
-        for x in range(width):
-            factor = (x + y) / max_dist
+    # Diagonal gradient factor for every pixel: (x + y) / max_dist
+    factor = np.add.outer(
+        np.arange(height, dtype=np.float32),
+        np.arange(width, dtype=np.float32)
+    ) / max_dist
+
+    arr = np.empty((height, width, 3), dtype=np.uint8)
+    for c in range(3):
+        arr[..., c] = (color1[c] + (color2[c] - color1[c]) * factor).astype(np.uint8)
 
-            r = int(color1[0] + (color2[0] - color1[0]) * factor)
-            g = int(color1[1] + (color2[1] - color1[1]) * factor)
-            b = int(color1[2] + (color2[2] - color1[2]) * factor)
+    return Image.fromarray(arr, 'RGB')
 
-            pixels[x, y] = (r, g, b)
 
-    return img
+def build_wave_points(size, wave_y, scale):
+    """Build the sine-wave polygon points as a list of (x, y) tuples."""
+    xs = np.arange(size + 1)
+    ys = wave_y + (30 * scale * np.sin(xs * 2 * np.pi / size)).astype(np.int32)
+    return list(zip(xs.tolist(), ys.tolist()))
 
 
 def draw_rounded_rect(draw, xy, radius, fill, outline=None, outline_width=1):
@@ -47,6 +105,12 @@ def draw_rounded_rect(draw, xy, radius, fill, outline=None, outline_width=1):
     x1, y1, x2, y2 = xy
     r = min(radius, (x2-x1)//2, (y2-y1)//2)
 
+    # Pillow >= 8.2 draws this in a single C call
+    if hasattr(draw, 'rounded_rectangle'):
+        draw.rounded_rectangle(xy, radius=r, fill=fill, outline=outline, width=outline_width)
+        return
+
+    # Fallback: compose from pieslices and rectangles
     draw.rectangle([x1+r, y1, x2-r, y2], fill=fill, outline=None)
     draw.rectangle([x1, y1+r, x2, y2-r], fill=fill, outline=None)
 
@@ -66,6 +130,24 @@ def draw_rounded_rect(draw, xy, radius, fill, outline=None, outline_width=1):
         draw.line([x2, y1+r, x2, y2-r], fill=outline, width=outline_width)
 
 
+@functools.lru_cache(maxsize=64)
+def _suit_sprite(symbol, font_size, color):
+    """Pre-rendered suit glyph cropped to its bbox (cached per size/color)."""
+    img = Image.new('RGBA', (font_size * 2, font_size * 2), (0, 0, 0, 0))
+    ImageDraw.Draw(img).text((0, 0), symbol, fill=color, font=get_symbol_font(font_size))
+    bbox = img.getbbox()
+    return img.crop(bbox) if bbox else img
+
+
+@functools.lru_cache(maxsize=32)
+def _rounded_mask(size):
+    """Rounded-corner mask for a square canvas (cached; never mutate)."""
+    mask = Image.new('L', (size, size), 0)
+    corner_radius = int(size * 80 / 512)
+    draw_rounded_rect(ImageDraw.Draw(mask), [0, 0, size-1, size-1], corner_radius, fill=255)
+    return mask
+
+
 def create_logo(size):
     """Create the app logo at specified size."""
     # Colors from SVG
@@ -78,11 +160,7 @@ def create_logo(size):
     dark = (27, 40, 56)          # #1B2838
 
     final = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    mask = Image.new('L', (size, size), 0)
-    mask_draw = ImageDraw.Draw(mask)
-
-    corner_radius = int(size * 80 / 512)
-    draw_rounded_rect(mask_draw, [0, 0, size-1, size-1], corner_radius, fill=255)
+    mask = _rounded_mask(size)
 
     # Create gradient for logo background
     logo_bg = create_gradient(size, size, bg_color1, bg_color2)
@@ -106,23 +184,12 @@ def create_logo(size):
     # Font for D letter
     font_size = int(180 * scale)
     small_font_size = int(40 * scale)
-
-    try:
-        for font_name in ['Georgia', 'C:\\Windows\\Fonts\\georgia.ttf', 'C:\\Windows\\Fonts\\times.ttf']:
-            try:
-                font = ImageFont.truetype(font_name, font_size)
-                break
-            except:
-                pass
-        else:
-            font = ImageFont.load_default()
-    except:
-        font = ImageFont.load_default()
+    font = get_font(font_size)
 
     # Draw D
     text = "D"
-    if hasattr(font, 'getbbox'):
-        bbox = font.getbbox(text)
+    bbox = get_letter_bbox(font_size, text)
+    if bbox:
         text_width = bbox[2] - bbox[0]
         text_height = bbox[3] - bbox[1]
     else:
@@ -136,11 +203,6 @@ def create_logo(size):
 
     # Suit symbols
     if size >= 128:
-        try:
-            symbol_font = ImageFont.truetype('C:\\Windows\\Fonts\\segoeui.ttf', small_font_size)
-        except:
-            symbol_font = font
-
         symbols = [
             ('\u2665', int(180 * scale), int(160 * scale), red),
             ('\u2660', int(332 * scale), int(160 * scale), dark),
@@ -148,9 +210,13 @@ def create_logo(size):
             ('\u2663', int(332 * scale), int(390 * scale), dark),
         ]
 
+        # Composite cached glyph sprites; one FreeType rasterization per
+        # (glyph, size, color) across the whole run
         for symbol, x, y, color in symbols:
             try:
-                draw.text((x - small_font_size//2, y - small_font_size), symbol, fill=color, font=symbol_font)
+                sprite = _suit_sprite(symbol, small_font_size, color)
+                final.alpha_composite(sprite, dest=(max(0, x - sprite.width // 2),
+                                                    max(0, y - sprite.height)))
             except:
                 pass
 
@@ -159,30 +225,29 @@ def create_logo(size):
         wave_y = int(450 * scale)
         wave_color = (64, 224, 208, 76)
 
-        wave = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-        wave_draw = ImageDraw.Draw(wave)
+        overlay = Image.new('RGBA', (size, size), (0, 0, 0, 0))
 
-        points = []
-        for x in range(size + 1):
-            y_offset = int(30 * scale * math.sin(x * 2 * math.pi / size))
-            y = wave_y + y_offset
-            points.append((x, y))
+        points = build_wave_points(size, wave_y, scale)
 
         points.append((size, size))
         points.append((0, size))
 
-        wave_draw.polygon(points, fill=wave_color)
-
-        wave_masked = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-        wave_masked.paste(wave, mask=mask)
+        ImageDraw.Draw(overlay).polygon(points, fill=wave_color)
 
-        final = Image.alpha_composite(final, wave_masked)
+        # Clip to the rounded corners via the alpha channel and composite
+        # in place - no second full-size temporary needed
+        overlay.putalpha(ImageChops.multiply(overlay.getchannel('A'), mask))
+        final.alpha_composite(overlay)
 
     return final
 
 
-def create_splash(width, height):
-    """Create splash screen with centered logo."""
+def create_splash(width, height, logo_master=None):
+    """Create splash screen with centered logo.
+
+    If logo_master is given, it is downscaled to the target logo size
+    instead of re-rasterizing the logo from scratch.
+    """
     # Gradient colors
     bg_color1 = (0, 105, 148)    # #006994
     bg_color2 = (0, 24, 37)      # #001825
@@ -195,7 +260,10 @@ def create_splash(width, height):
     logo_size = min(width, height) // 5
 
     # Create and paste logo
-    logo = create_logo(logo_size)
+    if logo_master is not None:
+        logo = logo_master.resize((logo_size, logo_size), Image.LANCZOS)
+    else:
+        logo = create_logo(logo_size)
 
     # Center position
     x = (width - logo_size) // 2
@@ -206,18 +274,54 @@ def create_splash(width, height):
     return final.convert('RGB')
 
 
+# Pillow's optimize=True runs zlib at high effort per save; when oxipng is
+# installed (optional) we encode fast and recompress once at the end, which
+# is both quicker and smaller
+OXIPNG = shutil.which('oxipng')
+SAVE_KWARGS = {'optimize': False, 'compress_level': 1} if OXIPNG else {'optimize': True}
+
+
+def optimize_pngs(paths):
+    """Recompress PNGs in-place with oxipng if it is installed."""
+    if OXIPNG and paths:
+        print("Recompressing with oxipng...")
+        subprocess.run([OXIPNG, '-o', '4', '--strip', 'safe', *paths], check=False)
+
+
+# High-res logo shared by the worker processes (rendered once per worker)
+_logo_master = None
+
+
+def _init_splash_worker():
+    global _logo_master
+    _logo_master = create_logo(512)
+
+
+def _render_one_splash(screen):
+    """Render and save a single splash screen (process pool worker)."""
+    name, width, height = screen
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    splash_dir = os.path.join(base_dir, 'splash')
+    output_path = os.path.join(splash_dir, f'splash-{name}-{width}x{height}.png')
+    print(f"Generating {name} ({width}x{height}) splash...")
+
+    splash = create_splash(width, height, _logo_master)
+    splash.save(output_path, 'PNG', **SAVE_KWARGS)
+    return output_path
+
+
 def generate_splash_screens():
     base_dir = os.path.dirname(os.path.abspath(__file__))
     splash_dir = os.path.join(base_dir, 'splash')
 
     os.makedirs(splash_dir, exist_ok=True)
 
-    for name, width, height in SPLASH_SCREENS:
-        output_path = os.path.join(splash_dir, f'splash-{name}-{width}x{height}.png')
-        print(f"Generating {name} ({width}x{height}) splash...")
+    # Each screen is independent and CPU-bound (gradient + PNG encode),
+    # so fan them out across a process pool
+    with ProcessPoolExecutor(initializer=_init_splash_worker) as ex:
+        paths = list(ex.map(_render_one_splash, SPLASH_SCREENS))
 
-        splash = create_splash(width, height)
-        splash.save(output_path, 'PNG', optimize=True)
+    optimize_pngs(paths)
 
     print(f"\nGenerated {len(SPLASH_SCREENS)} splash screens successfully!")
     return True
@@ -292,10 +292,7 @@
             socket.on('connect', () => {
                 console.log('Connected to server');
                 isConnected = true;
-            });
-
-            socket.on('connected', (data) => {
-                currentUserId = data.sid;
+                currentUserId = socket.id;
                 console.log('Session ID:', currentUserId);
             });
 
@@ -403,6 +400,25 @@
                 }
             });
 
+            // Swap events arrive fused: one payload covers the roster
+            // change and any seat moves
+            socket.on('players_rearranged', (data) => {
+                if (data.players[this.currentPosition]?.oderId !== currentUserId) {
+                    for (let i = 0; i < 4; i++) {
+                        if (data.players[i]?.oderId === currentUserId) {
+                            this.currentPosition = i;
+                            break;
+                        }
+                    }
+                }
+                if (this.onPlayersChanged) {
+                    this.onPlayersChanged(data.players);
+                }
+                if (this.onPositionChanged) {
+                    this.onPositionChanged(this.currentPosition);
+                }
+            });
+
             // Game started
             socket.on('game_started', (data) => {
                 console.log('game_started event received:', data);
@@ -518,6 +534,7 @@
             // Clean up listeners
             socket.off('players_changed');
             socket.off('position_changed');
+            socket.off('players_rearranged');
             socket.off('game_started');
 
             this.currentRoomId = null;
@@ -561,6 +578,7 @@
             this.roomId = roomId;
             this.userId = userId;
             this.localPosition = position;
+            this.gameState = null;
             this.onRemoteCardPlayed = null;
             this.onGameStateChanged = null;
             this.onRoundStarted = null;
@@ -583,15 +601,37 @@
                 }
             });
 
-            // Listen for game state updates
+            // The server batches plays per tick; replay them in order,
+            // skipping our own
+            socket.on('remote_cards_played', (data) => {
+                console.log('Remote cards played:', data);
+                for (const play of data.plays) {
+                    if (play.position === this.localPosition) continue;
+                    if (this.onRemoteCardPlayed) {
+                        this.onRemoteCardPlayed(play.card, play.position);
+                    }
+                }
+            });
+
+            // Full state snapshot (first update of a round, reconnects)
             socket.on('game_state_updated', (data) => {
+                this.gameState = data.gameState;
                 if (this.onGameStateChanged) {
                     this.onGameStateChanged(data.gameState);
                 }
             });
 
+            // Delta of top-level keys, applied to the cached snapshot
+            socket.on('game_state_changed', (data) => {
+                this.gameState = Object.assign({}, this.gameState || {}, data.changes);
+                if (this.onGameStateChanged) {
+                    this.onGameStateChanged(this.gameState);
+                }
+            });
+
             // Listen for new rounds
             socket.on('round_started', (data) => {
+                this.gameState = data.gameState;
                 if (this.onRoundStarted) {
                     this.onRoundStarted(data.gameState, data.hands);
                 }
@@ -601,7 +641,9 @@
         stopListening() {
             if (socket) {
                 socket.off('remote_card_played');
+                socket.off('remote_cards_played');
                 socket.off('game_state_updated');
+                socket.off('game_state_changed');
                 socket.off('round_started');
             }
             this.isListening = false;
@@ -665,6 +707,7 @@
             this.currentRoomId = null;
             this.currentPosition = null;
             this.maxPlayers = 4;
+            this.players = null;
             this.onPlayersChanged = null;
             this.onGameStart = null;
             this.onError = null;
@@ -678,13 +721,26 @@
             }
             console.log('DiGuLobbyManager: setting up listeners');
 
-            // Players changed
+            // Players changed (full roster snapshot on join/leave)
             socket.on('digu_players_changed', (data) => {
+                this.players = data.players;
                 if (this.onPlayersChanged) {
                     this.onPlayersChanged(data.players);
                 }
             });
 
+            // Single-player delta (ready toggles) applied to the cached roster
+            socket.on('digu_player_update', (data) => {
+                if (!this.players) return;  // no snapshot yet to apply onto
+                const player = this.players[data.position];
+                if (player) {
+                    Object.assign(player, data.changes);
+                }
+                if (this.onPlayersChanged) {
+                    this.onPlayersChanged(this.players);
+                }
+            });
+
             // Game started
             socket.on('digu_game_started', (data) => {
                 console.log('digu_game_started event received:', data);
@@ -697,6 +753,7 @@
             // Player left during game
             socket.on('digu_player_left', (data) => {
                 console.log('digu_player_left:', data);
+                this.players = data.players;
                 if (this.onPlayersChanged) {
                     this.onPlayersChanged(data.players);
                 }
@@ -722,6 +779,7 @@
                     this.currentRoomId = data.roomId;
                     this.currentPosition = data.position;
                     this.maxPlayers = data.maxPlayers;
+                    this.players = data.players;
                     this.setupSocketListeners();
 
                     if (this.onPlayersChanged) {
@@ -752,6 +810,7 @@
                     this.currentRoomId = data.roomId;
                     this.currentPosition = data.position;
                     this.maxPlayers = data.maxPlayers;
+                    this.players = data.players;
                     this.setupSocketListeners();
 
                     if (this.onPlayersChanged) {
@@ -806,6 +865,7 @@
 
             // Clean up listeners
             socket.off('digu_players_changed');
+            socket.off('digu_player_update');
             socket.off('digu_game_started');
             socket.off('digu_player_left');
 
@@ -5907,6 +5967,9 @@
 
         async onMatchFound(data) {
             console.log('onMatchFound called:', data);
+            // Server broadcasts one payload to the whole match; find our
+            // seat by matching our socket id against the roster
+            const position = data.position ?? data.players.findIndex(p => p && p.oderId === socket.id);
             // Clean up matchmaking listeners
             this.cleanupMatchmakingListeners();
 
@@ -5920,8 +5983,8 @@
             // Create lobby manager for this match
             this.lobbyManager = new LobbyManager();
             this.lobbyManager.currentRoomId = data.roomId;
-            this.lobbyManager.currentPosition = data.position;
-            console.log('LobbyManager created with position:', data.position);
+            this.lobbyManager.currentPosition = position;
+            console.log('LobbyManager created with position:', position);
 
             // Set up callbacks
             this.lobbyManager.onPlayersChanged = (players) => {
@@ -5936,7 +5999,7 @@
             this.lobbyManager.setupSocketListeners();
 
             // Set up presence
-            this.presenceManager = new PresenceManager(data.roomId, currentUserId, data.position);
+            this.presenceManager = new PresenceManager(data.roomId, currentUserId, position);
             await this.presenceManager.setupPresence();
 
             // Check if confirmation is required (quickplay)
@@ -6734,6 +6797,9 @@
 
         async onDiguMatchFound(data) {
             console.log('onDiguMatchFound called:', data);
+            // Room-wide payload: recover our seat from the roster (digu
+            // rosters are keyed by position)
+            const position = data.position ?? Number(Object.keys(data.players).find(k => data.players[k] && data.players[k].oderId === socket.id));
             this.cleanupDiguMatchmakingListeners();
 
             // Update UI
@@ -6742,7 +6808,8 @@
             // Create Digu lobby manager
             this.diguLobbyManager = new DiGuLobbyManager();
             this.diguLobbyManager.currentRoomId = data.roomId;
-            this.diguLobbyManager.currentPosition = data.position;
+            this.diguLobbyManager.currentPosition = position;
+            this.diguLobbyManager.players = data.players;
 
             this.diguLobbyManager.onPlayersChanged = (players) => {
                 this.updateDiguPlayerSlots(players);
@@ -6959,8 +7026,11 @@
 
             // Update start button state for host
             if (this.diguLobbyManager && this.diguLobbyManager.isHost()) {
-                const playerCount = Object.keys(players).length;
-                const allReady = Object.values(players).every(p => p.ready);
+                // Roster slots can be null (empty seats), so count and
+                // check only occupied ones
+                const occupied = Object.values(players).filter(Boolean);
+                const playerCount = occupied.length;
+                const allReady = occupied.every(p => p.ready);
                 const startBtn = document.getElementById('digu-start-game-btn');
                 if (startBtn) {
                     startBtn.disabled = playerCount < 2 || !allReady;
@@ -6984,7 +7054,7 @@
                 return;
             }
 
-            const numPlayers = Object.keys(this.diguLobbyManager.gameStartData?.players || {}).length || 4;
+            const numPlayers = Object.values(this.diguLobbyManager.gameStartData?.players || {}).filter(Boolean).length || 4;
 
             // Create deck and deal cards
             const deck = [];
@@ -7030,7 +7100,7 @@
             console.log('onDiguMultiplayerGameStart:', data);
 
             const position = this.diguLobbyManager ? this.diguLobbyManager.getPosition() : 0;
-            const numPlayers = Object.keys(data.players || {}).length || 4;
+            const numPlayers = Object.values(data.players || {}).filter(Boolean).length || 4;
 
             // Hide lobby
             this.lobbyOverlay.classList.add('hidden');
@@ -4,37 +4,170 @@ Python WebSocket server using Flask-SocketIO
 Supports: Dhiha Ei, Digu
 """
 
+# Prefer eventlet's cooperative workers: threading mode spawns a Python
+# thread per connection and the GIL serializes every broadcast. The
+# monkey patch must run before anything else is imported.
+try:
+    import eventlet
+    eventlet.monkey_patch()
+    ASYNC_MODE = 'eventlet'
+except ImportError:
+    eventlet = None
+    ASYNC_MODE = 'threading'
+
 import os
+import re
+import sys
+import gzip
+import heapq
+import logging
 import random
 import string
 import time
-import json
+import orjson
+import shutil
+import itertools
+import mimetypes
 import threading
 from flask import Flask, send_from_directory, request, jsonify
+from flask.json.provider import JSONProvider
+from werkzeug.utils import secure_filename
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
 
-app = Flask(__name__, static_folder='.', static_url_path='')
+# Lazy %s formatting: per-event debug lines (card plays, queue churn)
+# skip string building entirely unless LOG_LEVEL opts in
+logger = logging.getLogger(__name__)
+
+# No built-in static route: its catch-all would shadow serve_static
+# below, which adds cache headers and pre-compressed responses
+app = Flask(__name__, static_folder=None)
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson's C encoder"""
+
+    def dumps(self, obj, **kwargs):
+        # NON_STR_KEYS matches stdlib behaviour for the int-keyed Digu
+        # player dicts, which orjson otherwise refuses to encode
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+app.json = OrjsonProvider(app)
 
 # Admin config
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'thaasbai2024')
 SPONSORS_FILE = 'sponsors.json'
 CAMPAIGNS_FILE = 'campaigns.json'
 
-import uuid
+# The only sponsor slots the client knows about
+SPONSOR_SLOTS = frozenset({'table', 'drink', 'food', 'matchmaking', 'waiting_room'})
+
+# Updatable campaign fields, keyed by both the snake_case storage name
+# and the camelCase spelling the admin UI sends
+_CAMPAIGN_FIELD_ALIASES = {
+    'name': 'name',
+    'sponsor_slot': 'sponsor_slot', 'sponsorSlot': 'sponsor_slot',
+    'logo': 'logo',
+    'url': 'url',
+    'callout': 'callout',
+    'start_date': 'start_date', 'startDate': 'start_date',
+    'end_date': 'end_date', 'endDate': 'end_date',
+    'active': 'active',
+    'customer_id': 'customer_id', 'customerId': 'customer_id',
+}
+
+# Uploaded sponsor images land here; create it once instead of on
+# every upload request
+SPONSORS_DIR = os.path.join('.', 'icons', 'sponsors')
+os.makedirs(SPONSORS_DIR, exist_ok=True)
+
+# Sponsor logos are small; refuse anything bigger before touching disk
+app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024
+
+import atexit
+import functools
+import hmac
+import secrets
 import hashlib
+from dataclasses import dataclass
 from datetime import datetime
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# Precomputed once so the per-request check is a single constant-time
+# byte compare
+_ADMIN_PWD_BYTES = ADMIN_PASSWORD.encode()
+
+def check_admin_password(password):
+    """Constant-time admin password check"""
+    return bool(password) and hmac.compare_digest(password.encode(), _ADMIN_PWD_BYTES)
+
+def require_admin(f):
+    """Reject the request with 401 unless it carries the admin password.
+
+    Accepts the password from the JSON body, form data or query string -
+    the three places the admin endpoints take it from.
+    """
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        password = None
+        if request.is_json:
+            password = (request.get_json(silent=True) or {}).get('password')
+        if not password:
+            password = request.form.get('password') or request.args.get('password')
+        if not check_admin_password(password):
+            return jsonify({'error': 'Invalid password'}), 401
+        return f(*args, **kwargs)
+    return wrapper
+
+_password_hasher = PasswordHasher()
 
 def hash_password(password):
-    """Simple password hashing"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash a password with Argon2id"""
+    return _password_hasher.hash(password)
+
+def verify_password(stored, password):
+    """Check a password against a stored hash (argon2 or legacy sha256)"""
+    if stored.startswith('$argon2'):
+        try:
+            return _password_hasher.verify(stored, password)
+        except VerificationError:
+            return False
+    # Hashes written before the argon2 switch are unsalted sha256 hex
+    return hmac.compare_digest(
+        hashlib.sha256(password.encode()).hexdigest(), stored)
+
+# Portal session tokens: customer_login pays the argon2 verification
+# once and hands back a signed token, so the dashboard's polling
+# endpoints do a signature check instead of re-hashing per request.
+# Without SECRET_KEY the key is per-process random, which only means
+# tokens stop validating (and clients re-login) across restarts.
+_token_serializer = URLSafeTimedSerializer(
+    os.environ.get('SECRET_KEY') or secrets.token_hex(32),
+    salt='customer-portal')
+CUSTOMER_TOKEN_MAX_AGE = 3600  # seconds
+
+def issue_customer_token(customer_id):
+    """Sign a short-lived portal token for the customer"""
+    return _token_serializer.dumps(customer_id)
+
+def verify_customer_token(token, customer_id):
+    """True if the token is valid, unexpired and names this customer"""
+    try:
+        return _token_serializer.loads(
+            token, max_age=CUSTOMER_TOKEN_MAX_AGE) == customer_id
+    except BadSignature:
+        return False
 
 def load_campaigns():
     """Load campaigns data from JSON file"""
     if os.path.exists(CAMPAIGNS_FILE):
         try:
-            with open(CAMPAIGNS_FILE, 'r') as f:
-                return json.load(f)
+            with open(CAMPAIGNS_FILE, 'rb') as f:
+                return orjson.loads(f.read())
         except:
             pass
     return {
@@ -50,19 +183,159 @@ def load_campaigns():
     }
 
 def save_campaigns(data):
-    """Save campaigns data to JSON file"""
-    with open(CAMPAIGNS_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    """Save campaigns data to JSON file (atomic: temp file + rename)"""
+    with _camp_lock:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        tmp = CAMPAIGNS_FILE + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, CAMPAIGNS_FILE)
+        # Our own writes must be visible to the read cache immediately
+        _campaigns_cache['checked'] = float('-inf')
 
 # Load campaigns data
 campaigns_data = load_campaigns()
 
+# In-memory lookup indexes over campaigns_data (never persisted):
+# email -> customer_id for O(1) uniqueness checks, and
+# customer_id -> set of campaign_ids so per-customer operations don't
+# scan every campaign
+_emails_index = {c['email']: cid for cid, c in campaigns_data['customers'].items()}
+_campaigns_by_customer = {}
+for _campaign_id, _campaign in campaigns_data['campaigns'].items():
+    _campaigns_by_customer.setdefault(_campaign['customer_id'], set()).add(_campaign_id)
+
+# Rolled-up impression/click totals per customer, maintained
+# incrementally by the stats endpoints so the portal's totals view
+# doesn't re-sum every campaign per request
+_customer_totals = {}
+
+def _totals_for(customer_id):
+    return _customer_totals.setdefault(customer_id, {'impressions': 0, 'clicks': 0})
+
+def _update_ctr(campaign):
+    """Refresh the campaign's stored click-through rate from its stats"""
+    stats = campaign['stats']
+    if stats['impressions'] > 0:
+        campaign['ctr'] = round((stats['clicks'] / stats['impressions']) * 100, 2)
+    else:
+        campaign['ctr'] = 0
+
+for _campaign in campaigns_data['campaigns'].values():
+    _t = _totals_for(_campaign['customer_id'])
+    _t['impressions'] += _campaign['stats']['impressions']
+    _t['clicks'] += _campaign['stats']['clicks']
+    # Backfill the ctr field on records from before it was stored
+    if 'ctr' not in _campaign:
+        _update_ctr(_campaign)
+
+# Read-path cache for campaigns.json: the file is read-heavy/write-rare,
+# so re-parse it only when its mtime moves. The mtime itself is checked
+# at most once a second ('checked' is a monotonic timestamp): writes
+# from this process reset it for immediate pickup, and the deployment
+# is single-process so out-of-band edits only need eventual pickup.
+_campaigns_cache = {'mtime': -1, 'data': None, 'slot_index': {}, 'checked': float('-inf')}
+
+def _build_slot_index(data):
+    """Map each sponsor slot to its active campaign via active_sponsors"""
+    campaigns = data.get('campaigns', {})
+    slot_index = {}
+    for slot, campaign_id in data.get('active_sponsors', {}).items():
+        campaign = campaigns.get(campaign_id) if campaign_id else None
+        if campaign and campaign.get('active'):
+            slot_index[slot] = campaign
+
+    # Fallback one-pass scan for data written before the index was
+    # maintained (active flags set without an active_sponsors pointer)
+    for campaign in campaigns.values():
+        slot = campaign.get('sponsor_slot')
+        if campaign.get('active') and slot and slot not in slot_index:
+            slot_index[slot] = campaign
+    return slot_index
+
+def _sync_active_sponsor(campaign_id):
+    """Keep active_sponsors consistent with a campaign's active flag/slot"""
+    campaign = campaigns_data['campaigns'].get(campaign_id)
+    active_sponsors = campaigns_data['active_sponsors']
+
+    # Clear stale pointers (campaign deactivated or moved to another slot)
+    for slot, current in active_sponsors.items():
+        if current == campaign_id and (
+                campaign is None or not campaign.get('active')
+                or campaign.get('sponsor_slot') != slot):
+            active_sponsors[slot] = None
+
+    if campaign and campaign.get('active'):
+        slot = campaign.get('sponsor_slot')
+        if slot in active_sponsors:
+            previous = active_sponsors[slot]
+            if previous and previous != campaign_id and previous in campaigns_data['campaigns']:
+                campaigns_data['campaigns'][previous]['active'] = False
+            active_sponsors[slot] = campaign_id
+
+# Serializes read-modify-save sections on campaigns_data so the
+# background flusher can never serialize the dict mid-mutation (a real
+# hazard in the threading fallback, and a cheap no-contention acquire
+# under eventlet). Reentrant because handlers hold it across their
+# mutations and save_campaigns acquires it again.
+_camp_lock = threading.RLock()
+
+def with_camp_lock(f):
+    """Run the handler with the campaigns lock held"""
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        with _camp_lock:
+            return f(*args, **kwargs)
+    return wrapper
+
+# Impression/click events only bump in-memory counters; a background
+# worker coalesces them into one campaigns.json write per second instead
+# of rewriting the file on every ad event
+_campaigns_dirty = threading.Event()
+
+def mark_campaigns_dirty():
+    """Schedule a coalesced background write of campaigns data"""
+    _campaigns_dirty.set()
+
+def _campaigns_flush_loop():
+    while True:
+        _campaigns_dirty.wait()
+        time.sleep(1.0)  # let a burst of events settle into one write
+        _campaigns_dirty.clear()
+        save_campaigns(campaigns_data)
+
+threading.Thread(target=_campaigns_flush_loop, daemon=True).start()
+
+@atexit.register
+def _flush_campaigns_on_exit():
+    if _campaigns_dirty.is_set():
+        save_campaigns(campaigns_data)
+
+def get_campaigns_cached():
+    """Get campaigns data, re-reading the file only when it changed on disk"""
+    now = time.monotonic()
+    if _campaigns_cache['data'] is not None and now - _campaigns_cache['checked'] < 1.0:
+        return _campaigns_cache
+    _campaigns_cache['checked'] = now
+    try:
+        mtime = os.stat(CAMPAIGNS_FILE).st_mtime_ns
+    except OSError:
+        mtime = -1
+    if _campaigns_cache['data'] is None or mtime != _campaigns_cache['mtime']:
+        data = load_campaigns()
+        _campaigns_cache['mtime'] = mtime
+        _campaigns_cache['data'] = data
+        _campaigns_cache['slot_index'] = _build_slot_index(data)
+    return _campaigns_cache
+
 def load_sponsors():
     """Load sponsors from JSON file"""
     if os.path.exists(SPONSORS_FILE):
         try:
-            with open(SPONSORS_FILE, 'r') as f:
-                return json.load(f)
+            with open(SPONSORS_FILE, 'rb') as f:
+                return orjson.loads(f.read())
         except:
             pass
     # Default sponsors config
@@ -106,102 +379,293 @@ def load_sponsors():
 
 def save_sponsors(sponsors):
     """Save sponsors to JSON file"""
-    with open(SPONSORS_FILE, 'w') as f:
-        json.dump(sponsors, f, indent=2)
+    with open(SPONSORS_FILE, 'wb') as f:
+        f.write(orjson.dumps(sponsors, option=orjson.OPT_INDENT_2))
 
 # In-memory sponsor cache
 sponsors_cache = load_sponsors()
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Reuse the orjson provider for socket.io packets too; without this the
+# engine.io layer falls back to the stdlib json encoder for every emit
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE,
+                    json=app.json)
+
+@dataclass(slots=True)
+class PlayerSession:
+    """Where a connected socket lives: room, seat and game type.
+
+    Slots keep each session at a fixed handful of pointers instead of a
+    full dict; with one entry per connection this is the biggest
+    per-connection allocation we hold.
+    """
+    room_id: str
+    position: int
+    game_type: str = 'dhihaei'
 
 # In-memory storage for rooms and players
 rooms = {}  # Dhiha Ei rooms
 digu_rooms = {}  # Digu rooms
-player_sessions = {}  # Maps session ID to room and position
-matchmaking_queue = []  # List of {sid, name, joinedAt} for Dhiha Ei
-digu_matchmaking_queue = []  # List of {sid, name, joinedAt} for Digu
+DIGU_MIN_PLAYERS = 2
+_DIGU_MIN_PLAYERS_ERROR = {'message': f'Need at least {DIGU_MIN_PLAYERS} players to start'}
+player_sessions = {}  # Maps session ID to a PlayerSession
+
+# Sessions are deleted on disconnect/leave, but a socket that dies
+# without ever delivering its disconnect event would leave its entry
+# behind forever. A periodic sweep drops sessions whose sid is no
+# longer connected, so player_sessions stays bounded by live
+# connections rather than lifetime connection count.
+def _sweep_player_sessions():
+    while True:
+        time.sleep(60)
+        try:
+            is_connected = socketio.server.manager.is_connected
+            for sid in list(player_sessions):
+                if not is_connected(sid, '/'):
+                    player_sessions.pop(sid, None)
+        except Exception:
+            pass
+
+threading.Thread(target=_sweep_player_sessions, daemon=True).start()
+room_sid = {}  # Reverse index: Dhiha Ei room ID -> [sid or None] per position
+# Matchmaking queues are min-heaps of (joinedAt, seq, sid, name) with a
+# companion {sid: seq} map for O(1) membership checks. Removal is lazy:
+# the sid leaves the map immediately and its stale heap entry is skipped
+# on pop. The map stores the seq of the player's live entry, so a
+# leave-then-rejoin can't resurrect an older entry for the same sid.
+# The seq tie-breaker also keeps pops FIFO for equal timestamps, so
+# nobody can be starved past a later entrant.
+matchmaking_queue = []  # Dhiha Ei heap
+matchmaking_members = {}
+digu_matchmaking_queue = []  # Digu heap
+digu_matchmaking_members = {}
+_queue_seq = itertools.count()
+
+# Guards every queue mutation: adds, discards and the check-then-pop-4
+# step when a match forms. Under eventlet none of these sections yield,
+# so the lock is uncontended; under the threading fallback it stops a
+# disconnect from draining the heap mid-way through a pop-4 (which
+# would hand queue_pop back None). Emits stay outside the lock.
+_match_lock = threading.Lock()
+
+# Every queued socket also sits in a socket.io room so queue-status
+# updates are one room emit instead of one emit per waiting player
+QUEUE_ROOM = 'matchmaking_queue'
+DIGU_QUEUE_ROOM = 'digu_matchmaking_queue'
+
+def queue_add(heap, members, room, sid, name):
+    """Add a player to a matchmaking heap (no-op if already queued)"""
+    with _match_lock:
+        if sid in members:
+            return False
+        seq = next(_queue_seq)
+        members[sid] = seq
+        heapq.heappush(heap, (time.time(), seq, sid, name))
+    socketio.server.enter_room(sid, room)
+    return True
+
+def queue_discard(heap, members, room, sid):
+    """Lazily remove a player; their heap entry is skipped on pop"""
+    with _match_lock:
+        if members.pop(sid, None) is None:
+            return False
+    socketio.server.leave_room(sid, room)
+    return True
+
+def queue_pop(heap, members, room):
+    """Pop the longest-waiting player still in the queue.
+
+    Callers already hold _match_lock (match formation pops inside its
+    critical section), so this must not re-acquire it.
+    """
+    while heap:
+        joined_at, seq, sid, name = heapq.heappop(heap)
+        if members.get(sid) == seq:
+            del members[sid]
+            socketio.server.leave_room(sid, room)
+            return {'sid': sid, 'name': name, 'joinedAt': joined_at}
+    return None
+
+# 32 characters, so one random byte maps to one code character via & 31
+_CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+
+# Codes of every live room, both game types, so the collision probe is
+# one set lookup. Previously only Dhiha Ei rooms were checked, so a new
+# code could collide with a live Digu room.
+room_codes = set()
 
 def generate_room_code():
-    """Generate a 6-character room code"""
-    chars = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+    """Generate a 6-character code unused by any live room"""
     while True:
-        code = ''.join(random.choice(chars) for _ in range(6))
-        if code not in rooms:
+        code = ''.join(_CODE_ALPHABET[b & 31] for b in secrets.token_bytes(6))
+        if code not in room_codes:
+            room_codes.add(code)
             return code
 
+_ROOM_CODE_RE = re.compile(r'\s*([A-Za-z0-9]{6})\s*')
+
+def normalize_room_code(raw):
+    """Validate a client-supplied room code, returning the canonical
+    (uppercase, interned) form or None.
+
+    Interning means codes typed by different clients share one string
+    object with the key already in the room dicts, so lookups hit the
+    pointer-equality fast path.
+    """
+    m = _ROOM_CODE_RE.fullmatch(raw) if isinstance(raw, str) else None
+    if m is None:
+        return None
+    return sys.intern(m.group(1).upper())
+
+# Room-state cache keyed by the room's version counter; touch_room
+# invalidates it whenever a handler mutates the room
+_room_state_cache = {}
+
+def touch_room(room_id):
+    """Mark a room's state as changed so cached payloads are rebuilt"""
+    room = rooms.get(room_id)
+    if room is not None:
+        room['metadata']['version'] += 1
+
 def get_room_state(room_id):
-    """Get serializable room state"""
+    """Get serializable room state (rebuilt only when the room changed)"""
     if room_id not in rooms:
+        _room_state_cache.pop(room_id, None)
         return None
     room = rooms[room_id]
-    return {
+    version = room['metadata'].get('version', 0)
+    cached = _room_state_cache.get(room_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    state = {
         'roomId': room_id,
         'metadata': room['metadata'],
         'players': room['players'],
         'gameState': room.get('gameState'),
         'hands': room.get('hands')
     }
+    _room_state_cache[room_id] = (version, state)
+    return state
 
 # Serve static files
+
+# Text assets get .gz siblings written once at startup so hot requests
+# serve pre-compressed bytes instead of compressing per response
+_COMPRESSIBLE = ('.js', '.css', '.html', '.svg', '.json', '.webmanifest')
+_STATIC_GZ_DIRS = ('js', 'css', 'cards')
+
+def _precompress_static():
+    """Write .gz siblings for the client's text assets (skip if current)"""
+    targets = [f for f in os.listdir('.')
+               if f.endswith(('.html', '.webmanifest')) or f == 'service-worker.js']
+    targets.append('manifest.json')
+    for static_dir in _STATIC_GZ_DIRS:
+        for dirpath, _, filenames in os.walk(static_dir):
+            targets.extend(os.path.join(dirpath, f) for f in filenames
+                           if f.endswith(_COMPRESSIBLE))
+    for path in targets:
+        if not os.path.exists(path):
+            continue
+        gz_path = path + '.gz'
+        if (not os.path.exists(gz_path)
+                or os.path.getmtime(gz_path) < os.path.getmtime(path)):
+            with open(path, 'rb') as f:
+                raw = f.read()
+            with open(gz_path, 'wb') as f:
+                f.write(gzip.compress(raw, 9))
+
+_precompress_static()
+
+def _static_max_age(path):
+    """Cache policy per asset type.
+
+    HTML, manifests and the service worker must revalidate on every
+    load; generated images and fonts are effectively immutable; the
+    rest revalidate hourly via the ETag send_from_directory already
+    emits. Sponsor logos are admin uploads replaced in place under the
+    same name, so they take the hourly default, not the immutable one.
+    """
+    if path.endswith(('.html', '.json', '.webmanifest')) or path == 'service-worker.js':
+        return 0
+    if (path.endswith(('.png', '.svg', '.ico', '.webp', '.woff', '.woff2'))
+            and not path.startswith('icons/sponsors/')):
+        return 31536000
+    return 3600
+
 @app.route('/')
 def index():
-    return send_from_directory('.', 'index.html')
+    return serve_static('index.html')
 
 @app.route('/<path:path>')
 def serve_static(path):
-    return send_from_directory('.', path)
+    max_age = _static_max_age(path)
+    if (path.endswith(_COMPRESSIBLE)
+            and 'gzip' in request.headers.get('Accept-Encoding', '')
+            and os.path.exists(path + '.gz')):
+        response = send_from_directory('.', path + '.gz', max_age=max_age)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Content-Type'] = (mimetypes.guess_type(path)[0]
+                                            or 'application/octet-stream')
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+    response = send_from_directory('.', path, max_age=max_age)
+    if path.endswith(_COMPRESSIBLE):
+        response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 # Sponsor API endpoints
 
+# Shared payload for every slot without an active campaign; never
+# mutated, only serialized
+_DISABLED_SLOT = {'enabled': False, 'name': '', 'logo': '', 'url': '', 'callout': ''}
+
+# Serialized /api/sponsors body, valid for one campaigns-file mtime
+_sponsors_body_cache = {'mtime': None, 'body': None}
+
 @app.route('/api/sponsors', methods=['GET'])
 def get_sponsors():
     """Get all sponsor configurations from active campaigns"""
-    # Reload campaigns data from file to get latest changes
-    fresh_data = load_campaigns()
-    campaigns = fresh_data.get('campaigns', {})
-
-    # Default sponsor structure for all slots
-    slots = ['table', 'drink', 'food', 'matchmaking', 'waiting_room']
-    result = {}
-
-    for slot in slots:
-        # Find active campaign for this slot
-        active_campaign = None
-        for campaign_id, campaign in campaigns.items():
-            if campaign.get('sponsor_slot') == slot and campaign.get('active'):
-                active_campaign = campaign
-                break
-
-        if active_campaign:
-            result[slot] = {
-                'enabled': True,
-                'name': active_campaign.get('name', ''),
-                'logo': active_campaign.get('logo', ''),
-                'url': active_campaign.get('url', ''),
-                'callout': active_campaign.get('callout', '')
-            }
-        else:
-            result[slot] = {
-                'enabled': False,
-                'name': '',
-                'logo': '',
-                'url': '',
-                'callout': ''
-            }
+    # Served from the in-memory cache; re-read only when the file changed
+    cache = get_campaigns_cached()
+
+    # The file mtime doubles as a version stamp: clients polling with
+    # If-None-Match skip the body (and its serialization) entirely
+    etag = f'W/"{cache["mtime"]}"'
+    if request.headers.get('If-None-Match') == etag:
+        return '', 304
+
+    # Full-hit path: the serialized body is cached against the same
+    # stamp, so repeat 200s are a dict lookup plus a bytes write
+    if _sponsors_body_cache['mtime'] != cache['mtime']:
+        slot_index = cache['slot_index']
+        result = {}
+        for slot in ('table', 'drink', 'food', 'matchmaking', 'waiting_room'):
+            active_campaign = slot_index.get(slot)
+            if active_campaign:
+                result[slot] = {
+                    'enabled': True,
+                    'name': active_campaign.get('name', ''),
+                    'logo': active_campaign.get('logo', ''),
+                    'url': active_campaign.get('url', ''),
+                    'callout': active_campaign.get('callout', '')
+                }
+            else:
+                result[slot] = _DISABLED_SLOT
+        _sponsors_body_cache['mtime'] = cache['mtime']
+        _sponsors_body_cache['body'] = orjson.dumps(result)
 
-    return jsonify(result)
+    response = app.response_class(_sponsors_body_cache['body'],
+                                  mimetype='application/json')
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'private, must-revalidate'
+    return response
 
 @app.route('/api/sponsors', methods=['POST'])
+@require_admin
 def update_sponsors():
     """Update sponsor configurations (requires admin password)"""
     global sponsors_cache
     data = request.get_json()
 
-    # Verify admin password
-    password = data.get('password')
-    if password != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid password'}), 401
-
     # Update sponsors
     sponsors = data.get('sponsors')
     if sponsors:
@@ -212,16 +676,12 @@ def update_sponsors():
     return jsonify({'error': 'No sponsor data provided'}), 400
 
 @app.route('/api/sponsors/<sponsor_id>', methods=['POST'])
+@require_admin
 def update_sponsor(sponsor_id):
     """Update a single sponsor (requires admin password)"""
     global sponsors_cache
     data = request.get_json()
 
-    # Verify admin password
-    password = data.get('password')
-    if password != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid password'}), 401
-
     if sponsor_id not in sponsors_cache:
         return jsonify({'error': 'Invalid sponsor ID'}), 404
 
@@ -240,17 +700,14 @@ def admin_login():
     data = request.get_json()
     password = data.get('password')
 
-    if password == ADMIN_PASSWORD:
+    if check_admin_password(password):
         return jsonify({'success': True})
     return jsonify({'error': 'Invalid password'}), 401
 
 @app.route('/api/admin/upload', methods=['POST'])
+@require_admin
 def upload_sponsor_image():
     """Upload sponsor image"""
-    password = request.form.get('password')
-    if password != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid password'}), 401
-
     if 'image' not in request.files:
         return jsonify({'error': 'No image provided'}), 400
 
@@ -258,13 +715,20 @@ def upload_sponsor_image():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
 
-    # Save to icons/sponsors folder
-    sponsors_dir = os.path.join('.', 'icons', 'sponsors')
-    os.makedirs(sponsors_dir, exist_ok=True)
-
-    filename = file.filename.replace(' ', '_')
-    filepath = os.path.join(sponsors_dir, filename)
-    file.save(filepath)
+    # Normalize the client-supplied name; secure_filename strips path
+    # separators and anything else that could escape SPONSORS_DIR
+    filename = secure_filename(file.filename)
+    if not filename:
+        return jsonify({'error': 'Invalid filename'}), 400
+    filepath = os.path.join(SPONSORS_DIR, filename)
+
+    # Stream in 1 MB chunks into a temp sibling and rename into place:
+    # far fewer write syscalls than the 16 KB default, and a dropped
+    # connection can't leave a half-written image being served
+    tmp = filepath + '.part'
+    with open(tmp, 'wb') as out:
+        shutil.copyfileobj(file.stream, out, length=1024 * 1024)
+    os.replace(tmp, filepath)
 
     return jsonify({
         'success': True,
@@ -276,12 +740,9 @@ def upload_sponsor_image():
 # ===========================================
 
 @app.route('/api/admin/customers', methods=['GET'])
+@require_admin
 def get_customers():
     """Get all customers (admin only)"""
-    password = request.args.get('password')
-    if password != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid password'}), 401
-
     # Return customers without passwords
     customers = {}
     for cid, customer in campaigns_data['customers'].items():
@@ -289,14 +750,13 @@ def get_customers():
     return jsonify(customers)
 
 @app.route('/api/admin/customers', methods=['POST'])
+@require_admin
+@with_camp_lock
 def create_customer():
     """Create a new customer (admin only)"""
     global campaigns_data
     data = request.get_json()
 
-    if data.get('password') != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid admin password'}), 401
-
     customer_name = data.get('name')
     customer_email = data.get('email')
     customer_password = data.get('customerPassword')
@@ -304,18 +764,18 @@ def create_customer():
     if not all([customer_name, customer_email, customer_password]):
         return jsonify({'error': 'Name, email and password are required'}), 400
 
-    # Check if email already exists
-    for cid, c in campaigns_data['customers'].items():
-        if c['email'] == customer_email:
-            return jsonify({'error': 'Email already exists'}), 400
+    # Check if email already exists (O(1) via the index)
+    if customer_email in _emails_index:
+        return jsonify({'error': 'Email already exists'}), 400
 
-    customer_id = str(uuid.uuid4())[:8]
+    customer_id = secrets.token_hex(4)
     campaigns_data['customers'][customer_id] = {
         'name': customer_name,
         'email': customer_email,
         'password': hash_password(customer_password),
         'created_at': datetime.now().isoformat()
     }
+    _emails_index[customer_email] = customer_id
     save_campaigns(campaigns_data)
 
     return jsonify({
@@ -325,54 +785,60 @@ def create_customer():
     })
 
 @app.route('/api/admin/customers/<customer_id>', methods=['PUT'])
+@require_admin
+@with_camp_lock
 def update_customer(customer_id):
     """Update a customer (admin only)"""
     global campaigns_data
     data = request.get_json()
 
-    if data.get('password') != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid admin password'}), 401
-
     if customer_id not in campaigns_data['customers']:
         return jsonify({'error': 'Customer not found'}), 404
 
     customer = campaigns_data['customers'][customer_id]
 
-    if data.get('name'):
+    changed = False
+    if data.get('name') and data['name'] != customer['name']:
         customer['name'] = data['name']
-    if data.get('email'):
+        changed = True
+    if data.get('email') and data['email'] != customer['email']:
+        _emails_index.pop(customer['email'], None)
         customer['email'] = data['email']
+        _emails_index[customer['email']] = customer_id
+        changed = True
     if data.get('customerPassword'):
         customer['password'] = hash_password(data['customerPassword'])
+        changed = True
 
-    save_campaigns(campaigns_data)
+    # No-op PUTs (admin UIs re-submit unchanged forms) skip the rewrite
+    if changed:
+        save_campaigns(campaigns_data)
     return jsonify({'success': True, 'message': 'Customer updated'})
 
 @app.route('/api/admin/customers/<customer_id>', methods=['DELETE'])
+@require_admin
+@with_camp_lock
 def delete_customer(customer_id):
     """Delete a customer (admin only)"""
     global campaigns_data
     data = request.get_json()
 
-    if data.get('password') != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid admin password'}), 401
-
     if customer_id not in campaigns_data['customers']:
         return jsonify({'error': 'Customer not found'}), 404
 
-    # Delete all campaigns for this customer
-    campaigns_data['campaigns'] = {
-        cid: c for cid, c in campaigns_data['campaigns'].items()
-        if c['customer_id'] != customer_id
-    }
+    # Delete this customer's campaigns via the index instead of
+    # rebuilding the whole campaigns dict
+    removed_campaigns = _campaigns_by_customer.pop(customer_id, set())
+    for campaign_id in removed_campaigns:
+        campaigns_data['campaigns'].pop(campaign_id, None)
 
-    # Clear active sponsors if they belonged to this customer's campaigns
+    # Clear active sponsors that pointed at the deleted campaigns
     for slot in campaigns_data['active_sponsors']:
-        campaign_id = campaigns_data['active_sponsors'][slot]
-        if campaign_id and campaign_id in campaigns_data['campaigns']:
-            if campaigns_data['campaigns'][campaign_id]['customer_id'] == customer_id:
-                campaigns_data['active_sponsors'][slot] = None
+        if campaigns_data['active_sponsors'][slot] in removed_campaigns:
+            campaigns_data['active_sponsors'][slot] = None
 
+    _emails_index.pop(campaigns_data['customers'][customer_id]['email'], None)
+    _customer_totals.pop(customer_id, None)
     del campaigns_data['customers'][customer_id]
     save_campaigns(campaigns_data)
 
@@ -383,32 +849,32 @@ def delete_customer(customer_id):
 # ===========================================
 
 @app.route('/api/admin/campaigns', methods=['GET'])
+@require_admin
 def get_all_campaigns():
     """Get all campaigns (admin only)"""
-    password = request.args.get('password')
-    if password != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid password'}), 401
-
     return jsonify(campaigns_data['campaigns'])
 
 @app.route('/api/admin/campaigns', methods=['POST'])
+@require_admin
+@with_camp_lock
 def create_campaign():
     """Create a new campaign (admin only)"""
     global campaigns_data
     data = request.get_json()
 
-    if data.get('password') != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid admin password'}), 401
-
     customer_id = data.get('customerId')
     if customer_id not in campaigns_data['customers']:
         return jsonify({'error': 'Customer not found'}), 404
 
-    campaign_id = str(uuid.uuid4())[:8]
+    sponsor_slot = data.get('sponsorSlot', 'table')
+    if sponsor_slot not in SPONSOR_SLOTS:
+        return jsonify({'error': 'Invalid sponsor slot'}), 400
+
+    campaign_id = secrets.token_hex(4)
     campaigns_data['campaigns'][campaign_id] = {
         'customer_id': customer_id,
         'name': data.get('name', 'New Campaign'),
-        'sponsor_slot': data.get('sponsorSlot', 'table'),
+        'sponsor_slot': sponsor_slot,
         'logo': data.get('logo', ''),
         'url': data.get('url', ''),
         'callout': data.get('callout', ''),
@@ -419,8 +885,11 @@ def create_campaign():
             'impressions': 0,
             'clicks': 0
         },
+        'ctr': 0,
         'created_at': datetime.now().isoformat()
     }
+    _campaigns_by_customer.setdefault(customer_id, set()).add(campaign_id)
+    _sync_active_sponsor(campaign_id)
     save_campaigns(campaigns_data)
 
     return jsonify({
@@ -430,50 +899,58 @@ def create_campaign():
     })
 
 @app.route('/api/admin/campaigns/<campaign_id>', methods=['PUT'])
+@require_admin
+@with_camp_lock
 def update_campaign(campaign_id):
     """Update a campaign (admin only)"""
     global campaigns_data
     data = request.get_json()
 
-    if data.get('password') != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid admin password'}), 401
-
     if campaign_id not in campaigns_data['campaigns']:
         return jsonify({'error': 'Campaign not found'}), 404
 
     campaign = campaigns_data['campaigns'][campaign_id]
 
-    # Map camelCase to snake_case
-    field_mapping = {
-        'sponsorSlot': 'sponsor_slot',
-        'startDate': 'start_date',
-        'endDate': 'end_date',
-        'customerId': 'customer_id'
-    }
-
-    # Update allowed fields (accept both camelCase and snake_case)
-    allowed_fields = ['name', 'sponsor_slot', 'logo', 'url', 'callout', 'start_date', 'end_date', 'active', 'customer_id']
-
-    for camel, snake in field_mapping.items():
-        if camel in data:
-            data[snake] = data[camel]
-
-    for field in allowed_fields:
-        if field in data:
-            campaign[field] = data[field]
-
-    save_campaigns(campaigns_data)
+    old_customer_id = campaign['customer_id']
+
+    # Single pass over the payload; the precomputed alias map accepts
+    # both camelCase and snake_case spellings and drops everything else
+    changed = False
+    for key, value in data.items():
+        field = _CAMPAIGN_FIELD_ALIASES.get(key)
+        if field is None:
+            continue
+        if field == 'sponsor_slot' and value not in SPONSOR_SLOTS:
+            return jsonify({'error': 'Invalid sponsor slot'}), 400
+        if campaign.get(field) != value:
+            campaign[field] = value
+            changed = True
+
+    if campaign['customer_id'] != old_customer_id:
+        _campaigns_by_customer.get(old_customer_id, set()).discard(campaign_id)
+        _campaigns_by_customer.setdefault(campaign['customer_id'], set()).add(campaign_id)
+        # Move this campaign's stats between the customers' rollups
+        old_totals = _totals_for(old_customer_id)
+        new_totals = _totals_for(campaign['customer_id'])
+        old_totals['impressions'] -= campaign['stats']['impressions']
+        old_totals['clicks'] -= campaign['stats']['clicks']
+        new_totals['impressions'] += campaign['stats']['impressions']
+        new_totals['clicks'] += campaign['stats']['clicks']
+
+    # No-op PUTs (admin UIs re-submit unchanged forms) skip the rewrite
+    if changed:
+        _sync_active_sponsor(campaign_id)
+        save_campaigns(campaigns_data)
     return jsonify({'success': True, 'message': 'Campaign updated'})
 
 @app.route('/api/admin/campaigns/<campaign_id>', methods=['DELETE'])
+@require_admin
+@with_camp_lock
 def delete_campaign(campaign_id):
     """Delete a campaign (admin only)"""
     global campaigns_data
     data = request.get_json()
 
-    if data.get('password') != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid admin password'}), 401
-
     if campaign_id not in campaigns_data['campaigns']:
         return jsonify({'error': 'Campaign not found'}), 404
 
@@ -482,20 +959,25 @@ def delete_campaign(campaign_id):
         if campaigns_data['active_sponsors'][slot] == campaign_id:
             campaigns_data['active_sponsors'][slot] = None
 
+    campaign = campaigns_data['campaigns'][campaign_id]
+    customer_id = campaign['customer_id']
+    _campaigns_by_customer.get(customer_id, set()).discard(campaign_id)
+    totals = _totals_for(customer_id)
+    totals['impressions'] -= campaign['stats']['impressions']
+    totals['clicks'] -= campaign['stats']['clicks']
     del campaigns_data['campaigns'][campaign_id]
     save_campaigns(campaigns_data)
 
     return jsonify({'success': True, 'message': 'Campaign deleted'})
 
 @app.route('/api/admin/campaigns/<campaign_id>/activate', methods=['POST'])
+@require_admin
+@with_camp_lock
 def activate_campaign(campaign_id):
     """Set a campaign as the active sponsor for its slot (admin only)"""
     global campaigns_data
     data = request.get_json()
 
-    if data.get('password') != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid admin password'}), 401
-
     if campaign_id not in campaigns_data['campaigns']:
         return jsonify({'error': 'Campaign not found'}), 404
 
@@ -523,6 +1005,7 @@ def activate_campaign(campaign_id):
 # ===========================================
 
 @app.route('/api/stats/impression', methods=['POST'])
+@with_camp_lock
 def record_impression():
     """Record an ad impression"""
     global campaigns_data
@@ -532,13 +1015,17 @@ def record_impression():
     if slot and slot in campaigns_data['active_sponsors']:
         campaign_id = campaigns_data['active_sponsors'][slot]
         if campaign_id and campaign_id in campaigns_data['campaigns']:
-            campaigns_data['campaigns'][campaign_id]['stats']['impressions'] += 1
-            save_campaigns(campaigns_data)
+            campaign = campaigns_data['campaigns'][campaign_id]
+            campaign['stats']['impressions'] += 1
+            _totals_for(campaign['customer_id'])['impressions'] += 1
+            _update_ctr(campaign)
+            mark_campaigns_dirty()
             return jsonify({'success': True})
 
     return jsonify({'success': False})
 
 @app.route('/api/stats/click', methods=['POST'])
+@with_camp_lock
 def record_click():
     """Record an ad click"""
     global campaigns_data
@@ -548,34 +1035,29 @@ def record_click():
     if slot and slot in campaigns_data['active_sponsors']:
         campaign_id = campaigns_data['active_sponsors'][slot]
         if campaign_id and campaign_id in campaigns_data['campaigns']:
-            campaigns_data['campaigns'][campaign_id]['stats']['clicks'] += 1
-            save_campaigns(campaigns_data)
+            campaign = campaigns_data['campaigns'][campaign_id]
+            campaign['stats']['clicks'] += 1
+            _totals_for(campaign['customer_id'])['clicks'] += 1
+            _update_ctr(campaign)
+            mark_campaigns_dirty()
             return jsonify({'success': True})
 
     return jsonify({'success': False})
 
 @app.route('/api/admin/stats/<campaign_id>', methods=['GET'])
+@require_admin
 def get_campaign_stats(campaign_id):
     """Get campaign statistics (admin only)"""
-    password = request.args.get('password')
-    if password != ADMIN_PASSWORD:
-        return jsonify({'error': 'Invalid password'}), 401
-
     if campaign_id not in campaigns_data['campaigns']:
         return jsonify({'error': 'Campaign not found'}), 404
 
     campaign = campaigns_data['campaigns'][campaign_id]
     stats = campaign['stats']
 
-    # Calculate CTR
-    ctr = 0
-    if stats['impressions'] > 0:
-        ctr = round((stats['clicks'] / stats['impressions']) * 100, 2)
-
     return jsonify({
         'impressions': stats['impressions'],
         'clicks': stats['clicks'],
-        'ctr': ctr,
+        'ctr': campaign['ctr'],
         'campaign_name': campaign['name'],
         'slot': campaign['sponsor_slot']
     })
@@ -594,69 +1076,72 @@ def customer_login():
     if not email or not password:
         return jsonify({'error': 'Email and password required'}), 400
 
-    hashed = hash_password(password)
-
-    for customer_id, customer in campaigns_data['customers'].items():
-        if customer['email'] == email and customer['password'] == hashed:
-            return jsonify({
-                'success': True,
-                'customerId': customer_id,
-                'name': customer['name']
-            })
+    # O(1) via the email index: one lookup, one hash verification
+    customer_id = _emails_index.get(email)
+    customer = campaigns_data['customers'].get(customer_id)
+    if customer and verify_password(customer['password'], password):
+        # Lazily migrate pre-argon2 sha256 hashes now that we have the
+        # plaintext; persisted via the coalescing flusher
+        if not customer['password'].startswith('$argon2'):
+            customer['password'] = hash_password(password)
+            mark_campaigns_dirty()
+        return jsonify({
+            'success': True,
+            'customerId': customer_id,
+            'name': customer['name'],
+            'token': issue_customer_token(customer_id)
+        })
 
     return jsonify({'error': 'Invalid credentials'}), 401
 
 @app.route('/api/customer/<customer_id>/campaigns', methods=['GET'])
 def get_customer_campaigns(customer_id):
     """Get campaigns for a customer"""
-    password = request.args.get('password')
-
-    # Verify customer credentials
     if customer_id not in campaigns_data['customers']:
         return jsonify({'error': 'Customer not found'}), 404
 
-    customer = campaigns_data['customers'][customer_id]
-    if hash_password(password) != customer['password']:
-        return jsonify({'error': 'Invalid password'}), 401
-
-    # Get customer's campaigns with stats
-    customer_campaigns = {}
-    for cid, campaign in campaigns_data['campaigns'].items():
-        if campaign['customer_id'] == customer_id:
-            stats = campaign['stats']
-            ctr = 0
-            if stats['impressions'] > 0:
-                ctr = round((stats['clicks'] / stats['impressions']) * 100, 2)
-
-            customer_campaigns[cid] = {
-                **campaign,
-                'ctr': ctr
-            }
+    # Prefer the login token (cheap signature check); fall back to the
+    # password for clients that still send it
+    token = request.args.get('token')
+    if token:
+        if not verify_customer_token(token, customer_id):
+            return jsonify({'error': 'Invalid or expired token'}), 401
+    else:
+        password = request.args.get('password')
+        customer = campaigns_data['customers'][customer_id]
+        if not password or not verify_password(customer['password'], password):
+            return jsonify({'error': 'Invalid password'}), 401
 
-    return jsonify(customer_campaigns)
+    # Campaigns carry their ctr field up to date, so the portal list is
+    # a plain index lookup - no per-request copies or CTR math
+    campaigns = campaigns_data['campaigns']
+    return jsonify({cid: campaigns[cid]
+                    for cid in _campaigns_by_customer.get(customer_id, ())})
 
 @app.route('/api/customer/<customer_id>/stats', methods=['GET'])
 def get_customer_total_stats(customer_id):
     """Get total stats across all campaigns for a customer"""
-    password = request.args.get('password')
-
     if customer_id not in campaigns_data['customers']:
         return jsonify({'error': 'Customer not found'}), 404
 
-    customer = campaigns_data['customers'][customer_id]
-    if hash_password(password) != customer['password']:
-        return jsonify({'error': 'Invalid password'}), 401
-
-    total_impressions = 0
-    total_clicks = 0
-    active_campaigns = 0
-
-    for campaign in campaigns_data['campaigns'].values():
-        if campaign['customer_id'] == customer_id:
-            total_impressions += campaign['stats']['impressions']
-            total_clicks += campaign['stats']['clicks']
-            if campaign['active']:
-                active_campaigns += 1
+    token = request.args.get('token')
+    if token:
+        if not verify_customer_token(token, customer_id):
+            return jsonify({'error': 'Invalid or expired token'}), 401
+    else:
+        password = request.args.get('password')
+        customer = campaigns_data['customers'][customer_id]
+        if not password or not verify_password(customer['password'], password):
+            return jsonify({'error': 'Invalid password'}), 401
+
+    # Totals come from the incremental rollup; only the customer's own
+    # (small) campaign set is touched for the active count
+    totals = _customer_totals.get(customer_id, {'impressions': 0, 'clicks': 0})
+    total_impressions = totals['impressions']
+    total_clicks = totals['clicks']
+    campaign_ids = _campaigns_by_customer.get(customer_id, ())
+    campaigns = campaigns_data['campaigns']
+    active_campaigns = sum(1 for cid in campaign_ids if campaigns[cid]['active'])
 
     total_ctr = 0
     if total_impressions > 0:
@@ -667,91 +1152,81 @@ def get_customer_total_stats(customer_id):
         'totalClicks': total_clicks,
         'totalCTR': total_ctr,
         'activeCampaigns': active_campaigns,
-        'totalCampaigns': sum(1 for c in campaigns_data['campaigns'].values() if c['customer_id'] == customer_id)
+        'totalCampaigns': len(campaign_ids)
     })
 
 # WebSocket Events
 
 @socketio.on('connect')
 def handle_connect():
-    print(f'Client connected: {request.sid}')
-    emit('connected', {'sid': request.sid})
+    # No welcome packet: the client already has this sid as socket.id
+    # once the handshake completes
+    logger.debug('Client connected: %s', request.sid)
 
 @socketio.on('disconnect')
 def handle_disconnect():
     sid = request.sid
-    print(f'Client disconnected: {sid}')
+    logger.debug('Client disconnected: %s', sid)
 
     # Remove from Dhiha Ei matchmaking queue if present
-    global matchmaking_queue
-    was_in_queue = any(p['sid'] == sid for p in matchmaking_queue)
-    matchmaking_queue = [p for p in matchmaking_queue if p['sid'] != sid]
-    if was_in_queue:
-        print(f'Removed disconnected player from queue. Queue size: {len(matchmaking_queue)}')
+    if queue_discard(matchmaking_queue, matchmaking_members, QUEUE_ROOM, sid):
+        logger.debug('Removed disconnected player from queue. Queue size: %s', len(matchmaking_members))
         # Update remaining players in queue
-        for player in matchmaking_queue:
-            socketio.emit('queue_update', {
-                'playersInQueue': len(matchmaking_queue),
-                'playersNeeded': 4 - len(matchmaking_queue)
-            }, to=player['sid'])
+        broadcast_queue_status()
 
     # Remove from Digu matchmaking queue if present
-    global digu_matchmaking_queue
-    was_in_digu_queue = any(p['sid'] == sid for p in digu_matchmaking_queue)
-    digu_matchmaking_queue = [p for p in digu_matchmaking_queue if p['sid'] != sid]
-    if was_in_digu_queue:
-        print(f'Removed disconnected player from Digu queue. Queue size: {len(digu_matchmaking_queue)}')
-        for player in digu_matchmaking_queue:
-            socketio.emit('digu_queue_update', {
-                'playersInQueue': len(digu_matchmaking_queue),
-                'playersNeeded': 4 - len(digu_matchmaking_queue)
-            }, to=player['sid'])
+    if queue_discard(digu_matchmaking_queue, digu_matchmaking_members, DIGU_QUEUE_ROOM, sid):
+        logger.debug('Removed disconnected player from Digu queue. Queue size: %s', len(digu_matchmaking_members))
+        broadcast_digu_queue_status()
 
     # Clean up player from room
     if sid in player_sessions:
         session = player_sessions[sid]
-        room_id = session['roomId']
-        position = session['position']
-        game_type = session.get('gameType', 'dhihaei')
+        room_id = session.room_id
+        position = session.position
+        game_type = session.game_type
 
         # Handle Digu rooms
         if game_type == 'digu' and room_id in digu_rooms:
             room = digu_rooms[room_id]
+            players = room['players']
 
-            if position in room['players']:
-                player_name = room['players'][position].get('name', f'Player {position + 1}')
+            if players[position] is not None:
+                player_name = players[position].get('name', f'Player {position + 1}')
 
                 if room['metadata']['status'] == 'playing':
-                    room['players'][position]['connected'] = False
-                    print(f'Player {player_name} disconnected from Digu game in room {room_id}')
+                    players[position]['connected'] = False
+                    logger.info('Player %s disconnected from Digu game in room %s', player_name, room_id)
                     emit('digu_player_left', {
                         'position': position,
                         'playerName': player_name,
                         'reason': 'disconnected',
-                        'players': room['players']
+                        'players': players
                     }, room=room_id)
                 else:
-                    del room['players'][position]
-                    room['metadata']['playerCount'] = len(room['players'])
+                    players[position] = None
+                    room['metadata']['playerCount'] -= 1
 
-                    if len(room['players']) == 0:
+                    if room['metadata']['playerCount'] == 0:
                         del digu_rooms[room_id]
-                        print(f'Digu room {room_id} deleted (empty)')
+                        room_codes.discard(room_id)
+                        logger.info('Digu room %s deleted (empty)', room_id)
                     else:
-                        emit('digu_players_changed', {'players': room['players']}, room=room_id)
+                        emit('digu_players_changed', {'players': players}, room=room_id)
 
         # Handle Dhiha Ei rooms
         elif room_id in rooms:
             room = rooms[room_id]
 
-            if position in room['players']:
+            if room['players'][position] is not None:
                 player_name = room['players'][position].get('name', f'Player {position + 1}')
 
                 # Mark player as disconnected or remove
                 if room['metadata']['status'] == 'playing':
                     # During game, notify all players that someone left
                     room['players'][position]['connected'] = False
-                    print(f'Player {player_name} disconnected from game in room {room_id}')
+                    touch_room(room_id)
+                    logger.info('Player %s disconnected from game in room %s', player_name, room_id)
                     emit('player_left_game', {
                         'position': position,
                         'playerName': player_name,
@@ -760,13 +1235,21 @@ def handle_disconnect():
                     }, room=room_id)
                 else:
                     # In lobby, remove player
-                    del room['players'][position]
-                    room['metadata']['playerCount'] = len(room['players'])
+                    removed = room['players'][position]
+                    room['players'][position] = None
+                    room['metadata']['playerCount'] -= 1
+                    if removed.get('ready'):
+                        room['metadata']['readyCount'] -= 1
+                    room_sid[room_id][position] = None
+                    touch_room(room_id)
 
                     # Delete room if empty
-                    if len(room['players']) == 0:
+                    if room['metadata']['playerCount'] == 0:
                         del rooms[room_id]
-                        print(f'Room {room_id} deleted (empty)')
+                        room_codes.discard(room_id)
+                        room_sid.pop(room_id, None)
+                        _room_state_cache.pop(room_id, None)
+                        logger.info('Room %s deleted (empty)', room_id)
                     else:
                         emit('players_changed', {'players': room['players']}, room=room_id)
 
@@ -775,7 +1258,7 @@ def handle_disconnect():
 @socketio.on('create_room')
 def handle_create_room(data):
     sid = request.sid
-    player_name = data.get('playerName', 'Player')
+    player_name = sys.intern(str(data.get('playerName', 'Player')))
 
     room_id = generate_room_code()
 
@@ -784,28 +1267,30 @@ def handle_create_room(data):
             'host': sid,
             'created': time.time(),
             'status': 'waiting',
-            'playerCount': 1
+            'playerCount': 1,
+            'readyCount': 0,
+            'version': 0
         },
-        'players': {
-            0: {
+        'players': [
+            {
                 'oderId': sid,
                 'name': player_name,
                 'ready': False,
                 'connected': True
-            }
-        },
+            },
+            None, None, None
+        ],
         'gameState': None,
         'hands': None
     }
 
-    player_sessions[sid] = {
-        'roomId': room_id,
-        'position': 0
-    }
+    room_sid[room_id] = [sid, None, None, None]
+
+    player_sessions[sid] = PlayerSession(room_id, 0)
 
     join_room(room_id)
 
-    print(f'Room {room_id} created by {player_name}')
+    logger.info('Room %s created by %s', room_id, player_name)
 
     emit('room_created', {
         'roomId': room_id,
@@ -816,10 +1301,10 @@ def handle_create_room(data):
 @socketio.on('join_room')
 def handle_join_room(data):
     sid = request.sid
-    room_id = data.get('roomId', '').upper().strip()
-    player_name = data.get('playerName', 'Player')
+    room_id = normalize_room_code(data.get('roomId', ''))
+    player_name = sys.intern(str(data.get('playerName', 'Player')))
 
-    if room_id not in rooms:
+    if room_id is None or room_id not in rooms:
         emit('error', {'message': 'Room not found'})
         return
 
@@ -832,7 +1317,7 @@ def handle_join_room(data):
     # Find empty slot
     position = None
     for i in range(4):
-        if i not in room['players']:
+        if room['players'][i] is None:
             position = i
             break
 
@@ -847,16 +1332,15 @@ def handle_join_room(data):
         'ready': False,
         'connected': True
     }
-    room['metadata']['playerCount'] = len(room['players'])
+    room['metadata']['playerCount'] += 1
+    room_sid[room_id][position] = sid
+    touch_room(room_id)
 
-    player_sessions[sid] = {
-        'roomId': room_id,
-        'position': position
-    }
+    player_sessions[sid] = PlayerSession(room_id, position)
 
     join_room(room_id)
 
-    print(f'{player_name} joined room {room_id} at position {position}')
+    logger.info('%s joined room %s at position %s', player_name, room_id, position)
 
     # Notify the joining player
     emit('room_joined', {
@@ -876,29 +1360,37 @@ def handle_leave_room():
         return
 
     session = player_sessions[sid]
-    room_id = session['roomId']
-    position = session['position']
+    room_id = session.room_id
+    position = session.position
 
     if room_id in rooms:
         room = rooms[room_id]
 
-        if position in room['players']:
-            player_name = room['players'][position].get('name', f'Player {position + 1}')
+        if room['players'][position] is not None:
+            removed = room['players'][position]
+            player_name = removed.get('name', f'Player {position + 1}')
             is_playing = room['metadata']['status'] == 'playing'
 
-            del room['players'][position]
-            room['metadata']['playerCount'] = len(room['players'])
+            room['players'][position] = None
+            room['metadata']['playerCount'] -= 1
+            if removed.get('ready'):
+                room['metadata']['readyCount'] -= 1
+            room_sid[room_id][position] = None
+            touch_room(room_id)
 
             leave_room(room_id)
 
             # Delete room if empty
-            if len(room['players']) == 0:
+            if room['metadata']['playerCount'] == 0:
                 del rooms[room_id]
-                print(f'Room {room_id} deleted (empty)')
+                room_codes.discard(room_id)
+                room_sid.pop(room_id, None)
+                _room_state_cache.pop(room_id, None)
+                logger.info('Room %s deleted (empty)', room_id)
             else:
                 if is_playing:
                     # Notify others that player left during game
-                    print(f'Player {player_name} left game in room {room_id}')
+                    logger.info('Player %s left game in room %s', player_name, room_id)
                     emit('player_left_game', {
                         'position': position,
                         'playerName': player_name,
@@ -918,40 +1410,47 @@ def handle_set_ready(data):
     sid = request.sid
     ready = data.get('ready', False)
 
-    if sid not in player_sessions:
+    session = player_sessions.get(sid)
+    if session is None:
         return
 
-    session = player_sessions[sid]
-    room_id = session['roomId']
-    position = session['position']
+    room_id = session.room_id
+    room = rooms.get(room_id)
+    if room is None:
+        return
 
-    if room_id in rooms and position in rooms[room_id]['players']:
-        rooms[room_id]['players'][position]['ready'] = ready
-        emit('players_changed', {'players': rooms[room_id]['players']}, room=room_id)
+    players = room['players']
+    player = players[session.position]
+    if player is not None:
+        if player['ready'] != ready:
+            player['ready'] = ready
+            room['metadata']['readyCount'] += 1 if ready else -1
+        touch_room(room_id)
+        emit('players_changed', {'players': players}, room=room_id)
 
 @socketio.on('swap_player')
 def handle_swap_player(data):
     sid = request.sid
     from_position = data.get('fromPosition')
 
-    if sid not in player_sessions:
+    session = player_sessions.get(sid)
+    if session is None:
         return
 
-    session = player_sessions[sid]
-    room_id = session['roomId']
-
     # Only host (position 0) can swap
-    if session['position'] != 0:
+    if session.position != 0:
         emit('error', {'message': 'Only host can assign teams'})
         return
 
-    if room_id not in rooms:
+    room_id = session.room_id
+    room = rooms.get(room_id)
+    if room is None:
         return
 
-    room = rooms[room_id]
     players = room['players']
 
-    if from_position not in players:
+    if (not isinstance(from_position, int) or not 0 <= from_position < 4
+            or players[from_position] is None):
         emit('error', {'message': 'No player in that position'})
         return
 
@@ -964,22 +1463,24 @@ def handle_swap_player(data):
     # Find empty slot on target team
     target_position = None
     for pos in target_positions:
-        if pos not in players:
+        if players[pos] is None:
             target_position = pos
             break
 
     player_to_move = players[from_position]
+    sids = room_sid[room_id]
 
     if target_position is not None:
         # Move to empty slot
         players[target_position] = player_to_move
-        del players[from_position]
-
-        # Update session for moved player
-        for sess_id, sess in player_sessions.items():
-            if sess['roomId'] == room_id and sess['position'] == from_position:
-                sess['position'] = target_position
-                break
+        players[from_position] = None
+
+        # Update reverse index and session for moved player
+        sid_moved = sids[from_position]
+        sids[target_position] = sid_moved
+        sids[from_position] = None
+        if sid_moved in player_sessions:
+            player_sessions[sid_moved].position = target_position
     else:
         # Swap with first player on target team
         target_position = target_positions[0]
@@ -988,18 +1489,20 @@ def handle_swap_player(data):
         players[target_position] = player_to_move
         players[from_position] = player_to_swap
 
-        # Update sessions for both players
-        for sess_id, sess in player_sessions.items():
-            if sess['roomId'] == room_id:
-                if sess['position'] == from_position:
-                    sess['position'] = target_position
-                elif sess['position'] == target_position:
-                    sess['position'] = from_position
+        # Update reverse index and sessions for both players
+        sid_moved = sids[from_position]
+        sid_swapped = sids[target_position]
+        sids[from_position], sids[target_position] = sid_swapped, sid_moved
+        if sid_moved in player_sessions:
+            player_sessions[sid_moved].position = target_position
+        if sid_swapped in player_sessions:
+            player_sessions[sid_swapped].position = from_position
 
-    emit('players_changed', {'players': players}, room=room_id)
+    touch_room(room_id)
 
-    # Notify affected players of their new positions
-    emit('position_changed', {
+    # One fused event carries the roster and the moved positions, so a
+    # swap costs a single serialize+send instead of two
+    emit('players_rearranged', {
         'fromPosition': from_position,
         'toPosition': target_position,
         'players': players
@@ -1009,38 +1512,39 @@ def handle_swap_player(data):
 def handle_start_game(data):
     sid = request.sid
 
-    if sid not in player_sessions:
+    session = player_sessions.get(sid)
+    if session is None:
         return
 
-    session = player_sessions[sid]
-    room_id = session['roomId']
-
     # Only host can start
-    if session['position'] != 0:
+    if session.position != 0:
         emit('error', {'message': 'Only host can start the game'})
         return
 
-    if room_id not in rooms:
+    room_id = session.room_id
+    room = rooms.get(room_id)
+    if room is None:
         return
 
-    room = rooms[room_id]
+    meta = room['metadata']
 
     # Verify 4 players and all ready
-    if len(room['players']) != 4:
+    if meta['playerCount'] != 4:
         emit('error', {'message': 'Need 4 players to start'})
         return
 
-    all_ready = all(p.get('ready', False) for p in room['players'].values())
-    if not all_ready:
+    if meta['readyCount'] != 4:
         emit('error', {'message': 'All players must be ready'})
         return
 
     # Set game state
-    room['metadata']['status'] = 'playing'
+    meta['status'] = 'playing'
     room['gameState'] = data.get('gameState', {})
     room['hands'] = data.get('hands', {})
+    room['stateSynced'] = False  # next update broadcasts a full snapshot
+    touch_room(room_id)
 
-    print(f'Game started in room {room_id}')
+    logger.info('Game started in room %s', room_id)
 
     emit('game_started', {
         'gameState': room['gameState'],
@@ -1048,67 +1552,100 @@ def handle_start_game(data):
         'players': room['players']
     }, room=room_id)
 
+# Card relays coalesce per room for one short tick, so a burst of plays
+# costs one serialize+send instead of one emit per card. The batch goes
+# to the whole room (no skip list - plays from several seats can share a
+# tick); each client drops entries for its own position.
+_CARD_FLUSH_TICK = 0.03  # seconds
+pending_cards = {}  # room_id -> list of {'card', 'position'}
+
+def _flush_cards(room_id):
+    socketio.sleep(_CARD_FLUSH_TICK)
+    plays = pending_cards.pop(room_id, None)
+    if plays:
+        socketio.emit('remote_cards_played', {'plays': plays}, room=room_id)
+
 @socketio.on('card_played')
 def handle_card_played(data):
     sid = request.sid
 
-    if sid not in player_sessions:
+    session = player_sessions.get(sid)
+    if session is None:
         return
 
-    session = player_sessions[sid]
-    room_id = session['roomId']
-    position = session['position']
+    room_id = session.room_id
+    position = session.position
 
     card = data.get('card')
 
-    print(f'Card played in room {room_id}: {card} by position {position}')
+    logger.debug('Card played in room %s: %s by position %s', room_id, card, position)
 
-    # Broadcast to all other players in room
-    emit('remote_card_played', {
-        'card': card,
-        'position': position
-    }, room=room_id, include_self=False)
+    # Buffer the play; the room's tick task relays the batch shortly
+    plays = pending_cards.get(room_id)
+    if plays is None:
+        pending_cards[room_id] = [{'card': card, 'position': position}]
+        socketio.start_background_task(_flush_cards, room_id)
+    else:
+        plays.append({'card': card, 'position': position})
 
 @socketio.on('update_game_state')
 def handle_update_game_state(data):
     sid = request.sid
 
-    if sid not in player_sessions:
+    session = player_sessions.get(sid)
+    if session is None:
         return
 
-    session = player_sessions[sid]
-    room_id = session['roomId']
-
-    if room_id in rooms:
-        rooms[room_id]['gameState'] = data.get('gameState', {})
-
-        emit('game_state_updated', {
-            'gameState': rooms[room_id]['gameState']
-        }, room=room_id, include_self=False)
+    room_id = session.room_id
+    room = rooms.get(room_id)
+    if room is not None:
+        incoming = data.get('gameState', {})
+        previous = room['gameState']
+        room['gameState'] = incoming
+        touch_room(room_id)
+
+        # The state schema is a flat dict of known keys, so after the
+        # first full broadcast of a round only the top-level entries
+        # that changed go out. Reconnects still get the full snapshot
+        # through get_room_state.
+        if room.get('stateSynced') and isinstance(previous, dict) and previous:
+            changes = {k: v for k, v in incoming.items()
+                       if k not in previous or previous[k] != v}
+            if changes:
+                emit('game_state_changed', {
+                    'changes': changes
+                }, room=room_id, include_self=False)
+        else:
+            room['stateSynced'] = True
+            emit('game_state_updated', {
+                'gameState': incoming
+            }, room=room_id, include_self=False)
 
 @socketio.on('new_round')
 def handle_new_round(data):
     sid = request.sid
 
-    if sid not in player_sessions:
+    session = player_sessions.get(sid)
+    if session is None:
         return
 
-    session = player_sessions[sid]
-    room_id = session['roomId']
-
     # Only host broadcasts new rounds
-    if session['position'] != 0:
+    if session.position != 0:
         return
 
-    if room_id in rooms:
-        rooms[room_id]['gameState'] = data.get('gameState', {})
-        rooms[room_id]['hands'] = data.get('hands', {})
+    room_id = session.room_id
+    room = rooms.get(room_id)
+    if room is not None:
+        room['gameState'] = data.get('gameState', {})
+        room['hands'] = data.get('hands', {})
+        room['stateSynced'] = False  # next update broadcasts a full snapshot
+        touch_room(room_id)
 
-        print(f'New round started in room {room_id}')
+        logger.info('New round started in room %s', room_id)
 
         emit('round_started', {
-            'gameState': rooms[room_id]['gameState'],
-            'hands': rooms[room_id]['hands']
+            'gameState': room['gameState'],
+            'hands': room['hands']
         }, room=room_id)
 
 @socketio.on('ready_for_round')
@@ -1116,33 +1653,29 @@ def handle_ready_for_round():
     """Handle player ready for next round"""
     sid = request.sid
 
-    if sid not in player_sessions:
+    session = player_sessions.get(sid)
+    if session is None:
         return
 
-    session = player_sessions[sid]
-    room_id = session['roomId']
-    position = session['position']
+    room_id = session.room_id
+    position = session.position
 
-    if room_id not in rooms:
+    room = rooms.get(room_id)
+    if room is None:
         return
 
-    room = rooms[room_id]
-
-    # Initialize ready_for_round tracking if not exists
-    if 'readyForRound' not in room:
-        room['readyForRound'] = {}
-
-    # Mark this player as ready
-    room['readyForRound'][position] = True
+    # Positions only ever get marked ready, so a set's size is the
+    # ready count - no per-call rescan
+    ready_positions = room.setdefault('readyForRound', set())
+    ready_positions.add(position)
 
-    print(f'Player {position} ready for next round in room {room_id}')
+    logger.debug('Player %s ready for next round in room %s', position, room_id)
 
     # Check if all 4 players are ready
-    ready_count = sum(1 for p in room['readyForRound'].values() if p)
-    if ready_count >= 4:
-        print(f'All players ready for next round in room {room_id}')
+    if len(ready_positions) >= 4:
+        logger.info('All players ready for next round in room %s', room_id)
         # Reset ready states for next time
-        room['readyForRound'] = {}
+        ready_positions.clear()
         # Notify all players
         emit('all_ready_for_round', {}, room=room_id)
 
@@ -1152,185 +1685,209 @@ def handle_ready_for_round():
 
 def remove_from_queue(sid):
     """Remove a player from the matchmaking queue"""
-    global matchmaking_queue
-    matchmaking_queue = [p for p in matchmaking_queue if p['sid'] != sid]
+    queue_discard(matchmaking_queue, matchmaking_members, QUEUE_ROOM, sid)
 
 # Track active match timeouts
-match_timeouts = {}
+# One background task services every confirmation deadline from a heap
+# instead of a threading.Timer (a full OS thread) per match. Firing
+# checks the room status, so matches that confirmed in time need no
+# cancellation bookkeeping - their entry just expires as a no-op.
+confirm_deadlines = []  # heap of (deadline, room_id)
+_confirm_timeout_task = None
+
+def schedule_confirmation_timeout(room_id, deadline):
+    """Queue a confirmation deadline for the shared timeout task"""
+    global _confirm_timeout_task
+    heapq.heappush(confirm_deadlines, (deadline, room_id))
+    if _confirm_timeout_task is None:
+        _confirm_timeout_task = socketio.start_background_task(_confirmation_timeout_loop)
+
+def _confirmation_timeout_loop():
+    while True:
+        now = time.time()
+        while confirm_deadlines and confirm_deadlines[0][0] <= now:
+            _, room_id = heapq.heappop(confirm_deadlines)
+            handle_confirmation_timeout(room_id)
+        if confirm_deadlines:
+            # Clamp at zero: time.sleep (the threading fallback) raises
+            # on negatives if draining overran the next deadline
+            socketio.sleep(max(0, min(confirm_deadlines[0][0] - time.time(), 1.0)))
+        else:
+            socketio.sleep(1.0)
+
+def handle_confirmation_timeout(room_id):
+    """Cancel a quick match whose confirmation window expired"""
+    room = rooms.get(room_id)
+    if room is None or room['metadata']['status'] != 'confirming':
+        return
+
+    # Check who didn't confirm
+    unconfirmed = []
+    confirmed = []
+    for pos, player in enumerate(room['players']):
+        if player is None:
+            continue
+        if not player.get('confirmed', False):
+            unconfirmed.append((pos, player))
+        else:
+            confirmed.append((pos, player))
+
+    logger.info('Match %s timeout: %s players did not confirm', room_id, len(unconfirmed))
+
+    # Notify unconfirmed players they were removed (payload built once
+    # per group, not per recipient)
+    timeout_payload = {'message': 'You did not confirm in time'}
+    for pos, player in unconfirmed:
+        socketio.emit('match_timeout', timeout_payload, to=player['oderId'])
+        # Clean up session
+        if player['oderId'] in player_sessions:
+            del player_sessions[player['oderId']]
+        socketio.server.leave_room(player['oderId'], room_id)
+
+    # Put confirmed players back in queue
+    cancelled_payload = {
+        'message': 'Match cancelled - some players did not confirm',
+        'requeued': True
+    }
+    for pos, player in confirmed:
+        socketio.emit('match_cancelled', cancelled_payload, to=player['oderId'])
+        # Clean up session and requeue
+        if player['oderId'] in player_sessions:
+            del player_sessions[player['oderId']]
+        socketio.server.leave_room(player['oderId'], room_id)
+        queue_add(matchmaking_queue, matchmaking_members,
+                  QUEUE_ROOM, player['oderId'], player['name'])
+
+    # Delete the room
+    del rooms[room_id]
+    room_codes.discard(room_id)
+    room_sid.pop(room_id, None)
+    _room_state_cache.pop(room_id, None)
+    logger.info('Match %s cancelled due to timeout', room_id)
+
+    # Check if we can start a new match with requeued players
+    broadcast_queue_status()
+    check_and_start_match()
 
 def check_and_start_match():
     """Check if we have 4 players and start a match"""
-    global matchmaking_queue
-
-    if len(matchmaking_queue) >= 4:
-        # Take first 4 players
-        match_players = matchmaking_queue[:4]
-        matchmaking_queue = matchmaking_queue[4:]
-
-        # Create a new room for this match
-        room_id = generate_room_code()
-
-        rooms[room_id] = {
-            'metadata': {
-                'host': match_players[0]['sid'],
-                'created': time.time(),
-                'status': 'confirming',  # New status for confirmation phase
-                'playerCount': 4,
-                'isQuickMatch': True,
-                'confirmDeadline': time.time() + 30  # 30 second deadline
-            },
-            'players': {},
-            'gameState': None,
-            'hands': None
+    with _match_lock:
+        if len(matchmaking_members) < 4:
+            return False
+        # Pop the four longest-waiting players
+        match_players = [queue_pop(matchmaking_queue, matchmaking_members, QUEUE_ROOM)
+                         for _ in range(4)]
+
+    # Create a new room for this match
+    room_id = generate_room_code()
+
+    rooms[room_id] = {
+        'metadata': {
+            'host': match_players[0]['sid'],
+            'created': time.time(),
+            'status': 'confirming',  # New status for confirmation phase
+            'playerCount': 4,
+            'readyCount': 0,
+            'version': 0,
+            'isQuickMatch': True,
+            'confirmDeadline': time.time() + 30  # 30 second deadline
+        },
+        'players': [None, None, None, None],
+        'gameState': None,
+        'hands': None
+    }
+    room_sid[room_id] = [None, None, None, None]
+
+    # Assign players to positions (0, 2 = Team A, 1, 3 = Team B)
+    positions = [0, 1, 2, 3]
+    random.shuffle(positions)  # Randomize team assignment
+
+    for i, player in enumerate(match_players):
+        position = positions[i]
+        rooms[room_id]['players'][position] = {
+            'oderId': player['sid'],
+            'name': player['name'],
+            'ready': False,  # Require confirmation
+            'connected': True,
+            'confirmed': False
         }
+        room_sid[room_id][position] = player['sid']
 
-        # Assign players to positions (0, 2 = Team A, 1, 3 = Team B)
-        positions = [0, 1, 2, 3]
-        random.shuffle(positions)  # Randomize team assignment
-
-        for i, player in enumerate(match_players):
-            position = positions[i]
-            rooms[room_id]['players'][position] = {
-                'oderId': player['sid'],
-                'name': player['name'],
-                'ready': False,  # Require confirmation
-                'connected': True,
-                'confirmed': False
-            }
-
-            player_sessions[player['sid']] = {
-                'roomId': room_id,
-                'position': position
-            }
+        player_sessions[player['sid']] = PlayerSession(room_id, position)
 
-            # Add player to socket room
-            join_room(room_id, sid=player['sid'])
+        # Add player to socket room directly through the manager; the
+        # Flask request-context shim adds nothing for an explicit sid
+        socketio.server.enter_room(player['sid'], room_id)
 
-        print(f'Quick match created: Room {room_id} with players {[p["name"] for p in match_players]} - awaiting confirmation')
+    logger.info('Quick match created: Room %s with players %s - awaiting confirmation', room_id, [p["name"] for p in match_players])
 
-        # Notify all matched players - they have 30 seconds to confirm
-        for i, player in enumerate(match_players):
-            position = player_sessions[player['sid']]['position']
-            socketio.emit('match_found', {
-                'roomId': room_id,
-                'position': position,
-                'players': rooms[room_id]['players'],
-                'confirmTimeout': 30,
-                'requiresConfirmation': True
-            }, to=player['sid'])
-
-        # Set up 30-second timeout
-        def handle_confirmation_timeout():
-            if room_id in rooms:
-                room = rooms[room_id]
-                if room['metadata']['status'] == 'confirming':
-                    # Check who didn't confirm
-                    unconfirmed = []
-                    confirmed = []
-                    for pos, player in room['players'].items():
-                        if not player.get('confirmed', False):
-                            unconfirmed.append((pos, player))
-                        else:
-                            confirmed.append((pos, player))
-
-                    print(f'Match {room_id} timeout: {len(unconfirmed)} players did not confirm')
-
-                    # Notify unconfirmed players they were removed
-                    for pos, player in unconfirmed:
-                        socketio.emit('match_timeout', {
-                            'message': 'You did not confirm in time'
-                        }, to=player['oderId'])
-                        # Clean up session
-                        if player['oderId'] in player_sessions:
-                            del player_sessions[player['oderId']]
-                        leave_room(room_id, sid=player['oderId'])
-
-                    # Put confirmed players back in queue
-                    for pos, player in confirmed:
-                        socketio.emit('match_cancelled', {
-                            'message': 'Match cancelled - some players did not confirm',
-                            'requeued': True
-                        }, to=player['oderId'])
-                        # Clean up session and requeue
-                        if player['oderId'] in player_sessions:
-                            del player_sessions[player['oderId']]
-                        leave_room(room_id, sid=player['oderId'])
-                        matchmaking_queue.append({
-                            'sid': player['oderId'],
-                            'name': player['name'],
-                            'joinedAt': time.time()
-                        })
-
-                    # Delete the room
-                    del rooms[room_id]
-                    print(f'Match {room_id} cancelled due to timeout')
-
-                    # Check if we can start a new match with requeued players
-                    broadcast_queue_status()
-                    check_and_start_match()
-
-            # Clean up timeout reference
-            if room_id in match_timeouts:
-                del match_timeouts[room_id]
-
-        # Start timeout timer
-        timer = threading.Timer(30, handle_confirmation_timeout)
-        timer.start()
-        match_timeouts[room_id] = timer
-
-        return True
-    return False
+    # Notify all matched players - they have 30 seconds to confirm.
+    # One room emit serializes the roster once; each client finds its
+    # own position by matching oderId against its socket id.
+    socketio.emit('match_found', {
+        'roomId': room_id,
+        'players': rooms[room_id]['players'],
+        'confirmTimeout': 30,
+        'requiresConfirmation': True
+    }, room=room_id)
+
+    # Set up the 30-second confirmation timeout
+    schedule_confirmation_timeout(room_id, rooms[room_id]['metadata']['confirmDeadline'])
+
+    return True
 
 @socketio.on('confirm_match')
 def handle_confirm_match():
     """Handle player confirming their quickplay match"""
     sid = request.sid
 
-    if sid not in player_sessions:
+    session = player_sessions.get(sid)
+    if session is None:
         emit('error', {'message': 'Not in a match'})
         return
 
-    session = player_sessions[sid]
-    room_id = session['roomId']
-    position = session['position']
+    room_id = session.room_id
+    position = session.position
 
-    if room_id not in rooms:
+    room = rooms.get(room_id)
+    if room is None:
         emit('error', {'message': 'Match not found'})
         return
 
-    room = rooms[room_id]
+    meta = room['metadata']
 
     # Only for quickmatch in confirming status
-    if not room['metadata'].get('isQuickMatch') or room['metadata']['status'] != 'confirming':
+    if not meta.get('isQuickMatch') or meta['status'] != 'confirming':
         emit('error', {'message': 'Not in confirmation phase'})
         return
 
     # Mark player as confirmed
-    if position in room['players']:
-        room['players'][position]['confirmed'] = True
-        room['players'][position]['ready'] = True
+    players = room['players']
+    player = players[position]
+    if player is not None:
+        player['confirmed'] = True
+        if not player['ready']:
+            meta['readyCount'] += 1
+        player['ready'] = True
+        touch_room(room_id)
 
-        print(f'Player {room["players"][position]["name"]} confirmed match {room_id}')
+        logger.debug('Player %s confirmed match %s', player["name"], room_id)
 
         # Notify all players of the confirmation
         socketio.emit('player_confirmed', {
             'position': position,
-            'players': room['players']
+            'players': players
         }, room=room_id)
 
         # Check if all players confirmed
-        all_confirmed = all(p.get('confirmed', False) for p in room['players'].values())
+        all_confirmed = all(p.get('confirmed', False) for p in players if p is not None)
 
         if all_confirmed:
-            # Cancel the timeout timer
-            if room_id in match_timeouts:
-                match_timeouts[room_id].cancel()
-                del match_timeouts[room_id]
-
+            # The heap entry expires as a no-op once status leaves 'confirming'
             # Transition to waiting/ready to start
             room['metadata']['status'] = 'waiting'
 
-            print(f'All players confirmed in match {room_id} - ready to start')
+            logger.info('All players confirmed in match %s - ready to start', room_id)
 
             # Notify all players that match is confirmed
             socketio.emit('all_confirmed', {
@@ -1340,17 +1897,16 @@ def handle_confirm_match():
 
 def broadcast_queue_status():
     """Broadcast current queue count to all waiting players"""
-    count = len(matchmaking_queue)
-    for player in matchmaking_queue:
-        socketio.emit('queue_update', {
-            'playersInQueue': count,
-            'playersNeeded': 4 - count
-        }, to=player['sid'])
+    count = len(matchmaking_members)
+    socketio.emit('queue_update', {
+        'playersInQueue': count,
+        'playersNeeded': 4 - count
+    }, room=QUEUE_ROOM)
 
 @socketio.on('join_queue')
 def handle_join_queue(data):
     sid = request.sid
-    player_name = data.get('playerName', 'Player')
+    player_name = sys.intern(str(data.get('playerName', 'Player')))
 
     # Remove if already in queue (rejoin)
     remove_from_queue(sid)
@@ -1361,17 +1917,14 @@ def handle_join_queue(data):
         return
 
     # Add to queue
-    matchmaking_queue.append({
-        'sid': sid,
-        'name': player_name,
-        'joinedAt': time.time()
-    })
+    queue_add(matchmaking_queue, matchmaking_members, QUEUE_ROOM, sid, player_name)
 
-    print(f'{player_name} joined matchmaking queue. Queue size: {len(matchmaking_queue)}')
+    count = len(matchmaking_members)
+    logger.debug('%s joined matchmaking queue. Queue size: %s', player_name, count)
 
     emit('queue_joined', {
-        'playersInQueue': len(matchmaking_queue),
-        'playersNeeded': max(0, 4 - len(matchmaking_queue))
+        'playersInQueue': count,
+        'playersNeeded': max(0, 4 - count)
     })
 
     # Broadcast updated queue status to all waiting
@@ -1384,11 +1937,8 @@ def handle_join_queue(data):
 def handle_leave_queue():
     sid = request.sid
 
-    was_in_queue = any(p['sid'] == sid for p in matchmaking_queue)
-    remove_from_queue(sid)
-
-    if was_in_queue:
-        print(f'Player left matchmaking queue. Queue size: {len(matchmaking_queue)}')
+    if queue_discard(matchmaking_queue, matchmaking_members, QUEUE_ROOM, sid):
+        logger.debug('Player left matchmaking queue. Queue size: %s', len(matchmaking_members))
         emit('queue_left', {})
         broadcast_queue_status()
 
@@ -1416,7 +1966,7 @@ def get_digu_room_state(room_id):
 def handle_create_digu_room(data):
     """Create a new Digu room (2-4 players)"""
     sid = request.sid
-    player_name = data.get('playerName', 'Player')
+    player_name = sys.intern(str(data.get('playerName', 'Player')))
     max_players = data.get('maxPlayers', 4)
 
     # Validate max_players
@@ -1425,6 +1975,15 @@ def handle_create_digu_room(data):
 
     room_id = generate_room_code()
 
+    # Fixed-size roster like the Dhiha Ei rooms: position indexes the
+    # list directly and empty seats are None
+    players = [None] * max_players
+    players[0] = {
+        'oderId': sid,
+        'name': player_name,
+        'ready': False,
+        'connected': True
+    }
     digu_rooms[room_id] = {
         'metadata': {
             'host': sid,
@@ -1434,27 +1993,16 @@ def handle_create_digu_room(data):
             'maxPlayers': max_players,
             'gameType': 'digu'
         },
-        'players': {
-            0: {
-                'oderId': sid,
-                'name': player_name,
-                'ready': False,
-                'connected': True
-            }
-        },
+        'players': players,
         'gameState': None,
         'hands': {}
     }
 
-    player_sessions[sid] = {
-        'roomId': room_id,
-        'position': 0,
-        'gameType': 'digu'
-    }
+    player_sessions[sid] = PlayerSession(room_id, 0, 'digu')
 
     join_room(room_id)
 
-    print(f'Digu room {room_id} created by {player_name} (max {max_players} players)')
+    logger.info('Digu room %s created by %s (max %s players)', room_id, player_name, max_players)
 
     emit('digu_room_created', {
         'roomId': room_id,
@@ -1467,10 +2015,10 @@ def handle_create_digu_room(data):
 def handle_join_digu_room(data):
     """Join an existing Digu room"""
     sid = request.sid
-    room_id = data.get('roomId', '').upper().strip()
-    player_name = data.get('playerName', 'Player')
+    room_id = normalize_room_code(data.get('roomId', ''))
+    player_name = sys.intern(str(data.get('playerName', 'Player')))
 
-    if room_id not in digu_rooms:
+    if room_id is None or room_id not in digu_rooms:
         emit('error', {'message': 'Room not found'})
         return
 
@@ -1481,11 +2029,12 @@ def handle_join_digu_room(data):
         return
 
     max_players = room['metadata']['maxPlayers']
+    players = room['players']
 
     # Find empty slot
     position = None
-    for i in range(max_players):
-        if i not in room['players']:
+    for i, p in enumerate(players):
+        if p is None:
             position = i
             break
 
@@ -1494,23 +2043,19 @@ def handle_join_digu_room(data):
         return
 
     # Add player
-    room['players'][position] = {
+    players[position] = {
         'oderId': sid,
         'name': player_name,
         'ready': False,
         'connected': True
     }
-    room['metadata']['playerCount'] = len(room['players'])
+    room['metadata']['playerCount'] += 1
 
-    player_sessions[sid] = {
-        'roomId': room_id,
-        'position': position,
-        'gameType': 'digu'
-    }
+    player_sessions[sid] = PlayerSession(room_id, position, 'digu')
 
     join_room(room_id)
 
-    print(f'{player_name} joined Digu room {room_id} at position {position}')
+    logger.info('%s joined Digu room %s at position %s', player_name, room_id, position)
 
     # Notify the joining player
     emit('digu_room_joined', {
@@ -1532,32 +2077,34 @@ def handle_leave_digu_room():
         return
 
     session = player_sessions[sid]
-    if session.get('gameType') != 'digu':
+    if session.game_type != 'digu':
         return
 
-    room_id = session['roomId']
-    position = session['position']
+    room_id = session.room_id
+    position = session.position
 
     if room_id in digu_rooms:
         room = digu_rooms[room_id]
+        players = room['players']
 
-        if position in room['players']:
-            player_name = room['players'][position].get('name', f'Player {position + 1}')
+        if players[position] is not None:
+            player_name = players[position].get('name', f'Player {position + 1}')
             is_playing = room['metadata']['status'] == 'playing'
 
-            del room['players'][position]
-            room['metadata']['playerCount'] = len(room['players'])
+            players[position] = None
+            room['metadata']['playerCount'] -= 1
 
             leave_room(room_id)
 
             # Delete room if empty
-            if len(room['players']) == 0:
+            if room['metadata']['playerCount'] == 0:
                 del digu_rooms[room_id]
-                print(f'Digu room {room_id} deleted (empty)')
+                room_codes.discard(room_id)
+                logger.info('Digu room %s deleted (empty)', room_id)
             else:
                 if is_playing:
                     # Notify others that player left during game
-                    print(f'Player {player_name} left Digu game in room {room_id}')
+                    logger.info('Player %s left Digu game in room %s', player_name, room_id)
                     emit('digu_player_left', {
                         'position': position,
                         'playerName': player_name,
@@ -1578,52 +2125,54 @@ def handle_digu_set_ready(data):
     sid = request.sid
     ready = data.get('ready', False)
 
-    if sid not in player_sessions:
+    session = player_sessions.get(sid)
+    if session is None or session.game_type != 'digu':
         return
 
-    session = player_sessions[sid]
-    if session.get('gameType') != 'digu':
+    room_id = session.room_id
+    room = digu_rooms.get(room_id)
+    if room is None:
         return
 
-    room_id = session['roomId']
-    position = session['position']
-
-    if room_id in digu_rooms and position in digu_rooms[room_id]['players']:
-        digu_rooms[room_id]['players'][position]['ready'] = ready
-        emit('digu_players_changed', {'players': digu_rooms[room_id]['players']}, room=room_id)
+    players = room['players']
+    player = players[session.position]
+    if player is None or player['ready'] == ready:
+        # No-op toggle (double-clicked ready button): skip the re-broadcast
+        return
+    player['ready'] = ready
+    # Delta payload: full roster snapshots only go out on join/leave
+    emit('digu_player_update', {
+        'position': session.position,
+        'changes': {'ready': ready}
+    }, room=room_id)
 
 @socketio.on('start_digu_game')
 def handle_start_digu_game(data):
     """Host starts the Digu game"""
     sid = request.sid
 
-    if sid not in player_sessions:
-        return
-
-    session = player_sessions[sid]
-    if session.get('gameType') != 'digu':
+    session = player_sessions.get(sid)
+    if session is None or session.game_type != 'digu':
         return
 
-    room_id = session['roomId']
-
     # Only host can start
-    if session['position'] != 0:
+    if session.position != 0:
         emit('error', {'message': 'Only host can start the game'})
         return
 
-    if room_id not in digu_rooms:
+    room_id = session.room_id
+    room = digu_rooms.get(room_id)
+    if room is None:
         return
 
-    room = digu_rooms[room_id]
-    min_players = 2
-
-    # Verify minimum players and all ready
-    if len(room['players']) < min_players:
-        emit('error', {'message': f'Need at least {min_players} players to start'})
+    # Verify minimum players and all ready (any() exits on the first
+    # unready player instead of materializing the full check)
+    players = room['players']
+    if room['metadata']['playerCount'] < DIGU_MIN_PLAYERS:
+        emit('error', _DIGU_MIN_PLAYERS_ERROR)
         return
 
-    all_ready = all(p.get('ready', False) for p in room['players'].values())
-    if not all_ready:
+    if any(p is not None and not p['ready'] for p in players):
         emit('error', {'message': 'All players must be ready'})
         return
 
@@ -1632,7 +2181,7 @@ def handle_start_digu_game(data):
     room['gameState'] = data.get('gameState', {})
     room['hands'] = data.get('hands', {})
 
-    print(f'Digu game started in room {room_id} with {len(room["players"])} players')
+    logger.info('Digu game started in room %s with %s players', room_id, room['metadata']['playerCount'])
 
     emit('digu_game_started', {
         'gameState': room['gameState'],
@@ -1645,20 +2194,22 @@ def handle_digu_draw_card(data):
     """Player draws a card from stock or discard"""
     sid = request.sid
 
-    if sid not in player_sessions:
+    session = player_sessions.get(sid)
+    if session is None or session.game_type != 'digu':
         return
 
-    session = player_sessions[sid]
-    if session.get('gameType') != 'digu':
-        return
+    room_id = session.room_id
+    position = session.position
 
-    room_id = session['roomId']
-    position = session['position']
+    # Nobody to relay to in a solo room
+    room = digu_rooms.get(room_id)
+    if room is None or room['metadata']['playerCount'] <= 1:
+        return
 
     source = data.get('source')  # 'stock' or 'discard'
     card = data.get('card')  # The card drawn (for discard pile)
 
-    print(f'Digu card drawn in room {room_id}: from {source} by position {position}')
+    logger.debug('Digu card drawn in room %s: from %s by position %s', room_id, source, position)
 
     # Broadcast to all other players in room
     emit('digu_remote_card_drawn', {
@@ -1672,19 +2223,20 @@ def handle_digu_discard_card(data):
     """Player discards a card"""
     sid = request.sid
 
-    if sid not in player_sessions:
+    session = player_sessions.get(sid)
+    if session is None or session.game_type != 'digu':
         return
 
-    session = player_sessions[sid]
-    if session.get('gameType') != 'digu':
-        return
+    room_id = session.room_id
+    position = session.position
 
-    room_id = session['roomId']
-    position = session['position']
+    room = digu_rooms.get(room_id)
+    if room is None or room['metadata']['playerCount'] <= 1:
+        return
 
     card = data.get('card')
 
-    print(f'Digu card discarded in room {room_id}: {card} by position {position}')
+    logger.debug('Digu card discarded in room %s: %s by position %s', room_id, card, position)
 
     # Broadcast to all other players in room
     emit('digu_remote_card_discarded', {
@@ -1697,20 +2249,17 @@ def handle_digu_declare(data):
     """Player declares Digu"""
     sid = request.sid
 
-    if sid not in player_sessions:
-        return
-
-    session = player_sessions[sid]
-    if session.get('gameType') != 'digu':
+    session = player_sessions.get(sid)
+    if session is None or session.game_type != 'digu':
         return
 
-    room_id = session['roomId']
-    position = session['position']
+    room_id = session.room_id
+    position = session.position
 
     melds = data.get('melds')  # The player's melds
     isValid = data.get('isValid', False)  # Whether the declaration is valid
 
-    print(f'Digu declared in room {room_id} by position {position}, valid: {isValid}')
+    logger.info('Digu declared in room %s by position %s, valid: %s', room_id, position, isValid)
 
     # Broadcast to all other players in room
     emit('digu_remote_declare', {
@@ -1719,45 +2268,56 @@ def handle_digu_declare(data):
         'isValid': isValid
     }, room=room_id, include_self=False)
 
+_DIGU_STATE_FLUSH_TICK = 0.05  # seconds
+pending_digu_state = {}  # room_id -> {'gameState': latest, 'sid': sender}
+
+def _flush_digu_state(room_id):
+    socketio.sleep(_DIGU_STATE_FLUSH_TICK)
+    pending = pending_digu_state.pop(room_id, None)
+    if pending and room_id in digu_rooms:
+        socketio.emit('digu_state_updated', {
+            'gameState': pending['gameState']
+        }, room=room_id, skip_sid=pending['sid'])
+
 @socketio.on('digu_update_state')
 def handle_digu_update_state(data):
     """Update Digu game state"""
     sid = request.sid
 
-    if sid not in player_sessions:
-        return
-
-    session = player_sessions[sid]
-    if session.get('gameType') != 'digu':
+    session = player_sessions.get(sid)
+    if session is None or session.game_type != 'digu':
         return
 
-    room_id = session['roomId']
-
-    if room_id in digu_rooms:
-        digu_rooms[room_id]['gameState'] = data.get('gameState', {})
-
-        emit('digu_state_updated', {
-            'gameState': digu_rooms[room_id]['gameState']
-        }, room=room_id, include_self=False)
+    room_id = session.room_id
+    room = digu_rooms.get(room_id)
+    if room is not None:
+        room['gameState'] = data.get('gameState', {})
+
+        # Still record the state above, but skip the dispatch machinery
+        # when the sender is alone in the room
+        if room['metadata']['playerCount'] > 1:
+            # Coalesce bursts (animation-frame updates): only the latest
+            # state per room is broadcast, once per flush tick
+            scheduled = room_id in pending_digu_state
+            pending_digu_state[room_id] = {'gameState': room['gameState'], 'sid': sid}
+            if not scheduled:
+                socketio.start_background_task(_flush_digu_state, room_id)
 
 @socketio.on('digu_game_over')
 def handle_digu_game_over(data):
     """Digu game ended"""
     sid = request.sid
 
-    if sid not in player_sessions:
-        return
-
-    session = player_sessions[sid]
-    if session.get('gameType') != 'digu':
+    session = player_sessions.get(sid)
+    if session is None or session.game_type != 'digu':
         return
 
-    room_id = session['roomId']
-    position = session['position']
+    room_id = session.room_id
+    position = session.position
 
     results = data.get('results')
 
-    print(f'Digu game over in room {room_id}')
+    logger.info('Digu game over in room %s', room_id)
 
     # Broadcast to all players in room
     emit('digu_remote_game_over', {
@@ -1770,28 +2330,25 @@ def handle_digu_new_match(data):
     """Start a new Digu match (host only)"""
     sid = request.sid
 
-    if sid not in player_sessions:
-        return
-
-    session = player_sessions[sid]
-    if session.get('gameType') != 'digu':
+    session = player_sessions.get(sid)
+    if session is None or session.game_type != 'digu':
         return
 
-    room_id = session['roomId']
-
     # Only host broadcasts new matches
-    if session['position'] != 0:
+    if session.position != 0:
         return
 
-    if room_id in digu_rooms:
-        digu_rooms[room_id]['gameState'] = data.get('gameState', {})
-        digu_rooms[room_id]['hands'] = data.get('hands', {})
+    room_id = session.room_id
+    room = digu_rooms.get(room_id)
+    if room is not None:
+        room['gameState'] = data.get('gameState', {})
+        room['hands'] = data.get('hands', {})
 
-        print(f'New Digu match started in room {room_id}')
+        logger.info('New Digu match started in room %s', room_id)
 
         emit('digu_match_started', {
-            'gameState': digu_rooms[room_id]['gameState'],
-            'hands': digu_rooms[room_id]['hands']
+            'gameState': room['gameState'],
+            'hands': room['hands']
         }, room=room_id)
 
 # ===========================================
@@ -1800,23 +2357,21 @@ def handle_digu_new_match(data):
 
 def remove_from_digu_queue(sid):
     """Remove a player from the Digu matchmaking queue"""
-    global digu_matchmaking_queue
-    digu_matchmaking_queue = [p for p in digu_matchmaking_queue if p['sid'] != sid]
+    queue_discard(digu_matchmaking_queue, digu_matchmaking_members, DIGU_QUEUE_ROOM, sid)
 
 def broadcast_digu_queue_status():
     """Broadcast current Digu queue count to all waiting players"""
-    count = len(digu_matchmaking_queue)
-    for player in digu_matchmaking_queue:
-        socketio.emit('digu_queue_update', {
-            'playersInQueue': count,
-            'playersNeeded': 4 - count
-        }, to=player['sid'])
+    count = len(digu_matchmaking_members)
+    socketio.emit('digu_queue_update', {
+        'playersInQueue': count,
+        'playersNeeded': 4 - count
+    }, room=DIGU_QUEUE_ROOM)
 
 @socketio.on('join_digu_queue')
 def handle_join_digu_queue(data):
     """Join the Digu matchmaking queue"""
     sid = request.sid
-    player_name = data.get('playerName', 'Player')
+    player_name = sys.intern(str(data.get('playerName', 'Player')))
 
     # Remove if already in queue (rejoin)
     remove_from_digu_queue(sid)
@@ -1827,17 +2382,14 @@ def handle_join_digu_queue(data):
         return
 
     # Add to queue
-    digu_matchmaking_queue.append({
-        'sid': sid,
-        'name': player_name,
-        'joinedAt': time.time()
-    })
+    queue_add(digu_matchmaking_queue, digu_matchmaking_members, DIGU_QUEUE_ROOM, sid, player_name)
 
-    print(f'{player_name} joined Digu matchmaking queue. Queue size: {len(digu_matchmaking_queue)}')
+    count = len(digu_matchmaking_members)
+    logger.debug('%s joined Digu matchmaking queue. Queue size: %s', player_name, count)
 
     emit('digu_queue_joined', {
-        'playersInQueue': len(digu_matchmaking_queue),
-        'playersNeeded': max(0, 4 - len(digu_matchmaking_queue))
+        'playersInQueue': count,
+        'playersNeeded': max(0, 4 - count)
     })
 
     # Broadcast updated queue status to all waiting
@@ -1848,76 +2400,119 @@ def handle_join_digu_queue(data):
 
 def check_and_start_digu_match():
     """Check if we have 4 players and start a Digu match"""
-    global digu_matchmaking_queue
-
-    if len(digu_matchmaking_queue) >= 4:
-        # Take first 4 players
-        match_players = digu_matchmaking_queue[:4]
-        digu_matchmaking_queue = digu_matchmaking_queue[4:]
-
-        # Create a new room for this match
-        room_id = generate_room_code()
-
-        digu_rooms[room_id] = {
-            'metadata': {
-                'host': match_players[0]['sid'],
-                'created': time.time(),
-                'status': 'waiting',
-                'playerCount': 4,
-                'maxPlayers': 4,
-                'gameType': 'digu',
-                'isQuickMatch': True
-            },
-            'players': {},
-            'gameState': None,
-            'hands': {}
-        }
+    with _match_lock:
+        if len(digu_matchmaking_members) < 4:
+            return False
+        # Pop the four longest-waiting players
+        match_players = [queue_pop(digu_matchmaking_queue, digu_matchmaking_members,
+                                   DIGU_QUEUE_ROOM) for _ in range(4)]
+
+    # Create a new room for this match
+    room_id = generate_room_code()
 
-        # Assign players to positions
-        for i, player in enumerate(match_players):
-            digu_rooms[room_id]['players'][i] = {
-                'oderId': player['sid'],
-                'name': player['name'],
-                'ready': True,  # Auto-ready for quick match
-                'connected': True
-            }
+    digu_rooms[room_id] = {
+        'metadata': {
+            'host': match_players[0]['sid'],
+            'created': time.time(),
+            'status': 'waiting',
+            'playerCount': 4,
+            'maxPlayers': 4,
+            'gameType': 'digu',
+            'isQuickMatch': True
+        },
+        'players': [None, None, None, None],
+        'gameState': None,
+        'hands': {}
+    }
 
-            player_sessions[player['sid']] = {
-                'roomId': room_id,
-                'position': i,
-                'gameType': 'digu'
-            }
+    # Assign players to positions
+    for i, player in enumerate(match_players):
+        digu_rooms[room_id]['players'][i] = {
+            'oderId': player['sid'],
+            'name': player['name'],
+            'ready': True,  # Auto-ready for quick match
+            'connected': True
+        }
 
-            # Add player to socket room
-            join_room(room_id, sid=player['sid'])
+        player_sessions[player['sid']] = PlayerSession(room_id, i, 'digu')
 
-        print(f'Digu quick match created: Room {room_id} with players {[p["name"] for p in match_players]}')
+        # Add player to socket room directly through the manager; the
+        # Flask request-context shim adds nothing for an explicit sid
+        socketio.server.enter_room(player['sid'], room_id)
 
-        # Notify all matched players
-        for i, player in enumerate(match_players):
-            socketio.emit('digu_match_found', {
-                'roomId': room_id,
-                'position': i,
-                'players': digu_rooms[room_id]['players']
-            }, to=player['sid'])
+    logger.info('Digu quick match created: Room %s with players %s', room_id, [p["name"] for p in match_players])
+
+    # Notify all matched players with a single room emit; clients
+    # recover their position from the roster by socket id
+    socketio.emit('digu_match_found', {
+        'roomId': room_id,
+        'players': digu_rooms[room_id]['players']
+    }, room=room_id)
 
-        return True
-    return False
+    return True
 
 @socketio.on('leave_digu_queue')
 def handle_leave_digu_queue():
     """Leave the Digu matchmaking queue"""
     sid = request.sid
 
-    was_in_queue = any(p['sid'] == sid for p in digu_matchmaking_queue)
-    remove_from_digu_queue(sid)
-
-    if was_in_queue:
-        print(f'Player left Digu matchmaking queue. Queue size: {len(digu_matchmaking_queue)}')
+    if queue_discard(digu_matchmaking_queue, digu_matchmaking_members, DIGU_QUEUE_ROOM, sid):
+        logger.debug('Player left Digu matchmaking queue. Queue size: %s', len(digu_matchmaking_members))
         emit('digu_queue_left', {})
         broadcast_digu_queue_status()
 
+_ROOM_REAP_INTERVAL = 30  # seconds
+_WAITING_ROOM_TTL = 3600  # seconds
+
+def _reap_stale_rooms():
+    """Drop rooms left behind by crashed or timed-out sockets.
+
+    Disconnects clean rooms up synchronously, but a room whose players
+    all vanished mid-game (status 'playing' keeps seats with
+    connected=False) or an hour-old lobby nobody can rejoin would
+    otherwise linger forever.
+    """
+    while True:
+        socketio.sleep(_ROOM_REAP_INTERVAL)
+        now = time.time()
+        for table in (rooms, digu_rooms):
+            for room_id in list(table):
+                room = table.get(room_id)
+                if room is None:
+                    continue
+                meta = room['metadata']
+                stale_lobby = (meta['status'] == 'waiting'
+                               and now - meta['created'] > _WAITING_ROOM_TTL)
+                all_gone = not any(p is not None and p.get('connected', True)
+                                   for p in room['players'])
+                if not (stale_lobby or all_gone):
+                    continue
+                # Tell anyone still attached before tearing down, and
+                # drop their sessions so later events fail loudly at
+                # the client instead of pointing at a dead room
+                if not all_gone:
+                    socketio.emit('error', {
+                        'message': 'Room closed due to inactivity'
+                    }, room=room_id)
+                for player in room['players']:
+                    if player is None:
+                        continue
+                    player_sessions.pop(player['oderId'], None)
+                    socketio.server.leave_room(player['oderId'], room_id)
+                del table[room_id]
+                room_codes.discard(room_id)
+                room_sid.pop(room_id, None)
+                _room_state_cache.pop(room_id, None)
+                logger.info('Room %s reaped (%s)', room_id,
+                            'all players disconnected' if all_gone else 'stale lobby')
+
 if __name__ == '__main__':
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'),
+                        format='%(asctime)s %(levelname)s %(message)s')
     port = int(os.environ.get('PORT', 8080))
-    print(f'Starting Thaasbai server on port {port}...')
-    socketio.run(app, host='0.0.0.0', port=port, debug=False, allow_unsafe_werkzeug=True)
+    logger.info('Starting Thaasbai server on port %s (%s)...', port, ASYNC_MODE)
+    socketio.start_background_task(_reap_stale_rooms)
+    if ASYNC_MODE == 'threading':
+        socketio.run(app, host='0.0.0.0', port=port, debug=False, allow_unsafe_werkzeug=True)
+    else:
+        socketio.run(app, host='0.0.0.0', port=port, debug=False)